@@ -20,268 +20,125 @@ The dice game Beetle, developed using Python 3.6.1, using a Tk GUI"""
 #    See the License for the specific language governing permissions and
 #    limitations under the License.
 
-from random import randint
+import argparse
+from collections import deque
 import signal
 import sys  # For capturing Ctrl+C
-from tkinter import *       # Tkinter GUI components
-from tkinter.ttk import *   # Modern Tkinter ToolKit components
-
-class Die:
-    """Die that can roll between 1 and given number. Default of 6 sides"""
-
-    def __init__(self, num_sides=6):
-        """Default number of sides is 6"""
-        self.__num_sides = num_sides
-
-    def roll(self) -> int:
-        """Generates a random number"""
-        return randint(1, self.__num_sides)
-
-
-class Beetle:
-    """The core class of this program.
-
-    Holds data related to game state for a single player."""
-
-    def __init__(self, name=None):
-        """Creates a new gameboard for a player"""
-        self.name = name
-        self._body = False
-        self._head = False
-        self._left_legs = False
-        self._right_legs = False
-        self._left_antenna = False
-        self._right_antenna = False
-        self._left_eye = False
-        self._right_eye = False
-
-    def turn(self, roll) -> bool:
-        """Represents the act of taking a turn in the game.
-
-        Moves forward a step in the state machine"""
-
-        # Create the body if 1 is rolled
-        if not self._body and roll == 1:
-            print(self.name, "rolled a 1, built body")
-            self._body = True
-            return True
-
-        # Create the head if 2 is rolled once 1 has already been rolled
-        if self._body and not self._head and roll == 2:
-            print(self.name, "rolled a 2, built head")
-            self._head = True
-            return True
-
-        # Create the left legs if 3 is rolled
-        if self._head and not self._left_legs and roll == 3:
-            print(self.name, "rolled a 3, built left legs")
-            self._left_legs = True
-            return True
-
-        # Create the right legs if 3 is rolled
-        if self._left_legs and not self._right_legs and roll == 3:
-            print(self.name, "rolled a 3, built right legs")
-            self._right_legs = True
-            return True
-
-        # Create the left antenna if 4 is rolled
-        if self._right_legs and not self._left_antenna and roll == 4:
-            print(self.name, "rolled a 4, built left antenna")
-            self._left_antenna = True
-            return True
-
-        # Create the right antenna if 4 is rolled
-        if self._left_antenna and not self._right_antenna and roll == 4:
-            print(self.name, "rolled a 4, built right antenna")
-            self._right_antenna = True
-            return True
-
-        # Create the left eye if 5 is rolled
-        if self._right_antenna and not self._left_eye and roll == 5:
-            print(self.name, "rolled a 5, built left eye")
-            self._left_eye = True
-            return True
-
-        # Create the right eye if 5 is rolled
-        if self._left_eye and not self._right_eye and roll == 5:
-            print(self.name, "rolled a 5, built right eye")
-            self._right_eye = True
-            return True
-
-        return False  # we didn't move forward in the state machine
-
-    def __str__(self) -> str:
-        """Pretty string representation of the beetle"""
-        # There are 8 parts, and 100 percent
-        percent_complete = sum([self._body, self._head,
-                                self._left_legs, self._right_legs,
-                                self._left_antenna, self._right_antenna,
-                                self._left_eye, self._right_eye]) * 100 / 8
-        return '{} is {}% complete'.format(self.name, percent_complete)
-
-    def print(self):
-        """Prints string representation directly to console"""
-        print(self)
-
-    def complete(self) -> bool:
-        """Returns true if beetle is complete and the game has been won
-
-        All parts must exist."""
-        return self._body and self._head and \
-               self._left_legs and self._right_legs and \
-               self._left_antenna and self._right_antenna and \
-               self._left_eye and self._right_eye
-
-
-class TkBeetle(Beetle):
-    """A Beetle that can also draw itself to a Tk label"""
-    def __init__(self, name=None, imageLabel=None, app=None):
-        Beetle.__init__(self, name=name)
-        self._image_label = imageLabel
-        self._app = app
 
-    def draw(self):
-        """Draws the beetle to image_label using included gif images"""
-        image = self._app.none_image
-        if self._body:
-            image = self._app.body_image
-        if self._head:
-            image = self._app.head_image
-        if self._left_legs:
-            image = self._app.left_legs_image
-        if self._right_legs:
-            image = self._app.right_legs_image
-        if self._left_antenna:
-            image = self._app.left_antenna_image
-        if self._right_antenna:
-            image = self._app.right_antenna_image
-        if self._left_eye:
-            image = self._app.left_eye_image
-        if self._right_eye:
-            image = self._app.right_eye_image
-        self._image_label['image'] = image
-
-    def turn(self, roll):
-        """Represents the act of taking a turn in the game.
-
-        Moves forward a step in the state machine,
-        then draws itself to the screen"""
-        # take a normal turn and store the result to return later
-        # before drawing to the screen
-        out = Beetle.turn(self, roll)
-        self.draw()
-        return out
+# The rules tables, Die and Beetle are shared with the command line version
+from beetle_cli import RULES, Beetle, Die
+from beetle_events import CONSOLE
+from beetle_rules import load_rules
+
+
+class Renderer:
+    """Batches widget updates into one Tk idle callback
+
+    set records the value a widget option should show. The first set after
+    a redraw schedules flush with after_idle, and flush writes only the
+    options whose value differs from what is already on screen, so a round
+    touches each widget at most once."""
+
+    def __init__(self, widget):
+        """widget is any Tk widget, used to schedule the redraws"""
+        self._widget = widget
+        self._shown = {}    # (id(widget), option): value on screen
+        self._pending = {}  # (id(widget), option): (widget, option, value) to show
+        self._scheduled = False
+
+    def set(self, widget, option, value):
+        """Shows value as option of widget at the next redraw"""
+        key = (id(widget), option)
+        if key not in self._pending and self._shown.get(key) == value:
+            return  # already on screen
+        self._pending[key] = (widget, option, value)
+        if not self._scheduled:
+            self._scheduled = True
+            self._widget.after_idle(self.flush)
+
+    def get(self, widget, option):
+        """Value option of widget will have after the next redraw"""
+        key = (id(widget), option)
+        if key in self._pending:
+            return self._pending[key][2]
+        return self._shown.get(key)
+
+    def flush(self):
+        """Writes every changed option to its widget"""
+        shown = self._shown
+        for key, (widget, option, value) in self._pending.items():
+            if shown.get(key) != value:
+                widget[option] = value
+                shown[key] = value
+        self._pending.clear()
+        self._scheduled = False
+
+
+INFO_LINES = 4  # rolls of the round shown at once, the latest ones
 
 
 class Game:
     """Class representing a single game.
 
     One instance will be created for each new game."""
-    def __init__(self, app=None):
-        """Sets up a new game"""
-        self.__players = []
+    def __init__(self, app=None, die=None, sink=CONSOLE, profiler=None):
+        """Sets up a new game, rolling die if given or a new Die for
+        app.rules otherwise.
+
+        There is a player for each of app.num_players seats, made by
+        app.new_beetle. Rolls, parts built and the win are reported to sink.
+        If a Profiler is given, the die, beetles and sink are wrapped to
+        feed it"""
         self._app = app
-        self.__players.append(TkBeetle("Player 1", imageLabel=app.beetle_1, app=app))
-        self.__players.append(TkBeetle("Player 2", imageLabel=app.beetle_2, app=app))
-        self.__die = Die()
+        self.__profiler = profiler
+        if die is None:
+            die = Die(app.rules.num_sides)
+        if profiler is not None:
+            die = profiler.wrap_die(die)
+            sink = profiler.wrap_sink(sink)
+        self.__players = [app.new_beetle("Player " + str(seat + 1), seat, sink)
+                          for seat in range(app.num_players)]
+        if profiler is not None:
+            self.__players = [profiler.wrap_beetle(player) for player in self.__players]
+        self.__die = die
+        self.__sink = sink
         self.complete = False
 
     def turn(self):
         """Takes a turn for the current player."""
-        round_info = ""
+        sink = self.__sink
+        round_info = deque(maxlen=INFO_LINES)  # one line per roll this round
         for player in self.__players:
             roll = self.__die.roll()
             player.turn(roll)
-            round_info += '{} rolled a {}\n'.format(player.name, roll)
-            print(round_info)
-            self._app.infotext['text'] = round_info
+            if sink.enabled:
+                sink.roll(player.name, roll)
+            round_info.append('{} rolled a {}\n'.format(player.name, roll))
+            self._app.renderer.set(self._app.infotext, 'text', ''.join(round_info))
             if player.complete():
-                if player.name is not None or player.name is not "":
-                    print(player.name, "wins!")
-                print("GAME OVER")
+                if sink.enabled:
+                    sink.win(player.name)
                 self.complete = True
                 yield True # yield returns a generator object that keeps track of its internal state
             yield False    # so we can call turn multiple times per round, once for each player
 
     def round(self):
         """Takes a turn for all players"""
-        for turn in self.turn():
+        turns = self.turn()
+        if self.__profiler is not None:
+            turns = self.__profiler.count_round(turns)
+        for turn in turns:
             if turn:
                 return True
         return False
 
 
-class Application(Frame):
-    """Application class wrapping the main GUI frame"""
-    def __init__(self, parent):
-        Frame.__init__(self, parent, padding="3 3 12 12")
-        self._parent = parent
-        self.setup()
-        self.reset()
-
-    def setup(self):
-        """Initialize the window and create some constants"""
-        # We need to keep a reference to each of the images to keep them from
-        # being garbage collected.
-        # Also, they should be "public" so that the beetles can get to them
-        self.none_image = PhotoImage(file='none.gif')
-        self.body_image = PhotoImage(file='body.gif')
-        self.head_image = PhotoImage(file='head.gif')
-        self.left_legs_image = PhotoImage(file='left_legs.gif')
-        self.right_legs_image = PhotoImage(file='right_legs.gif')
-        self.left_antenna_image = PhotoImage(file='left_antenna.gif')
-        self.right_antenna_image = PhotoImage(file='right_antenna.gif')
-        self.left_eye_image = PhotoImage(file='left_eye.gif')
-        self.right_eye_image = PhotoImage(file='right_eye.gif')
-
-        self.grid(column=0, row=0, sticky=(N, W, E, S))
-        self.columnconfigure(0, weight=1)
-        self.rowconfigure(0, weight=1)
-
-        # beetle_1 and beetle_2 need to be "public" for the same reason as the images
-        self.beetle_1 = Label(self)
-        self.beetle_1['image'] = self.none_image
-        self.beetle_1.grid(column=0, row=0, sticky=(N, W))
-
-        self.beetle_2 = Label(self)
-        self.beetle_2['image'] = self.none_image
-        self.beetle_2.grid(column=2, row=0, sticky=(N, E))
-
-        self.infotext = Label(self, text="Testing")
-        self.infotext.grid(column=1, row=1, sticky=(W, S, E))
-
-        self._turn_button = Button(self, text="Roll", command=self.turn)
-        self._turn_button.grid(column=0, row=1, sticky=(W, S))
-
-        self._reset_button = Button(self, text="Reset", command=self.reset)
-        self._reset_button.grid(column=2, row=1, sticky=(E, S))
-
-        for child in self.winfo_children():
-            # go through every child and set some params
-            child.grid_configure(padx=5, pady=5)
-
-        self._turn_button.focus()
-
-    def turn(self):
-        """Takes a turn in the game"""
-        self._game.round()
-        if self._game.complete:
-            self.game_over()
-
-    def game_over(self):
-        """Caled when a player wins the game"""
-        # The game is over! Disable rolling more turns.
-        self._turn_button.state(['disabled'])
-        self._reset_button.focus()
-        self.infotext['text'] += "Game Over!"
-
-    def reset(self):
-        """Resets the game state"""
-        self._game = Game(app=self)
-        self.beetle_1['image'] = self.none_image
-        self.beetle_2['image'] = self.none_image
-        self._turn_button.state(['!disabled'])
-        self._turn_button.focus()
+def __getattr__(name):
+    """Application lives in beetle_tk, so tkinter is only loaded for the GUI"""
+    if name == 'Application':
+        from beetle_tk import Application
+        return Application
+    raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
 
 
 def cli_main():
@@ -315,10 +172,56 @@ def exit_game():
 
 def main():
     """Sets up and runs the Tk GUI"""
+    parser = argparse.ArgumentParser(description="The dice game Beetle")
+    parser.add_argument('--profile', action='store_true',
+                        help="count rolls and time each phase, reporting to stderr")
+    parser.add_argument('--replay', default=None,
+                        help="show a game from this replay file instead of playing")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="instead of a replay file, show game GAME of the campaign with this seed")
+    parser.add_argument('--game', type=int, default=0, help="game number to show")
+    parser.add_argument('--players', type=int, default=2, help="number of players")
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+    if args.players < 1:
+        parser.error("--players must be at least 1")
+    if rules is not RULES and (args.seed is not None or args.replay is not None):
+        parser.error("replays record the standard rules only")
+
+    profiler = None
+    if args.profile:
+        from beetle_profile import Profiler
+        profiler = Profiler(rules=rules)
+
+    replay = None
+    if args.seed is not None:
+        from beetle_replay import ReplayCursor
+        replay = ReplayCursor.from_seed(args.seed, args.game, args.players)
+    elif args.replay is not None:
+        from beetle_replay import ReplayCursor, ReplayReader
+        with ReplayReader(args.replay) as reader:
+            for game in reader:
+                if game.game == args.game:
+                    replay = ReplayCursor(game.num_players, bytes(game.rolls))
+                    break
+        if replay is None:
+            print("No game", args.game, "in", args.replay)
+            sys.exit(1)
+
+    from tkinter import Tk
+    from beetle_tk import Application
+
     root = Tk()
     root.title("Beetle by Jacob Rigby")
 
-    app = Application(parent=root)
+    app = Application(parent=root, profiler=profiler, replay=replay, num_players=args.players,
+                      rules=rules)
 
     app.mainloop()
 
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""Images of the beetle's parts, embedded as image data
+
+PART_LAYERS[part] is (x, y, data): the pixels that building part adds to
+the beetle, as a base64 encoded PNG with a transparent background ready
+for PhotoImage(data=...), and where its top left corner goes on a board
+of BOARD_SIZE, the size of a complete beetle. Drawing the layers of the
+built parts over each other gives the picture of that stage, but for a
+few pixels that later stages clear. Embedding them means the GUI reads no
+files at start up, wherever it is run from.
+
+Generated from the stage GIF files next to this module. Run this module
+to generate it again after changing them."""
+
+import base64
+import os
+import struct
+import zlib
+
+# GIF files of the beetle at each build stage, in build order
+STAGE_FILES = ('none.gif', 'body.gif', 'head.gif',
+               'left_legs.gif', 'right_legs.gif',
+               'left_antenna.gif', 'right_antenna.gif',
+               'left_eye.gif', 'right_eye.gif')
+
+# Size of a board holding a complete beetle
+BOARD_SIZE = (393, 442)
+
+PART_LAYERS = (
+    # body.gif
+    (83, 143,
+    'iVBORw0KGgoAAAANSUhEUgAAAOYAAAErCAYAAADKa/9lAAADxklEQVR42u3TgQkCQBADQftvWlsQ'
+    'VNz8T2AauGMfD6vv+SNm9ucIxWo2EqFYzYZCFKqJUaRmYhSpiVGkZoIUqAkSgZogBWomSIGaIAVq'
+    'JkiBmiARqIlSnCZIBGqiFKcJEoGaKBGnIBGoiRJxmijFaYJEoCZKxClKxGmiRJyiRJwmSAQqShCn'
+    'KBGniRJxihJxmigRpygRp4kScQoThClKxClKEKcoEaeJEnGKEsQpSsQpTBCmKBGnKEGcokScwgRh'
+    'ihLEKUrEKUwQpigRpyhBnMIEUYI4RQl3x+mpCFOUIE5RIk5hgjBFCYfF6XkIU5QgTmGCKEGcooTD'
+    '4vQkhClKEKcwYSxMjwFhgjBFCYNxegbEwvQICMbpCSBMEKYoYTBOx4dYmA4PwTgdHWJhOjgE43Rs'
+    'ECYIU5QwGKcjQyxMB4ZgnI4LwgRhihIG43RUECYIU5QwGKdjgjBBmKKEwTgdEYQJwhQlDMbpeCBM'
+    'EKYwYTBMh4NgnI4GwgRhChMGw3QwCMbpWCBMEKYoQZjAN+J0JBAmIEwYDNOBIBin44AwAWGCMAFh'
+    'wqFhOgwE43QUECYgTBAmIEwQJiBMuDhMBwFhAu/E6RggTECYIExAmHBomA4BwTgdAYQJCBOECQgT'
+    'hAkIE4QJCBMQJggTECYIExAmCBMQJiBMECYgTBAmIEwQJiBMQJggTECYIExAmCBMQJiAMEGYwCdh'
+    'ihOCUQoThAkIE4QJCBMOD1OcEIxSmCBMQJggTECYIExAmCBMR4FimOKEYJTCBGECwgRhAsKEw8MU'
+    'JwSjFCYIExAmDIcpTghGKUwQJghTmDAcpjghGKUwQZggTGHCcJjihGCUwgRhgjCFCcNhihOCUQoT'
+    'hAnCFCcMRylMECYIU5wwHKUwQZggTHHCcJTCBGGCMMUJw1EKE6JhihOCUQoThAnCFCcMRylMiIYp'
+    'TghGKUyIhilOCEYpTBAmCFOcMBylMCEapjghGKUwIRqmOBGlMEGY4oThKIWJMMUJohQnjEcpTIQp'
+    'ThClMGE8THEiSmGCMMWJKMUJohQmXBKmOBGlOEGUwkSY4gRRihNRChOEKU4QpTgRpTBBmOJElOIE'
+    'UYoTUQoThClOkJ04EaU4QZTiRJTiBFGKE1GaMBGmOBGliRNRihNEKU5EKU4QpTgRpQkUUYoTQZo4'
+    'EaU4EaWJE1GaOEVpAkWQJk5EKU5EaQJFkCZOUZpAEaSJU5QmUARp4hSlmUAFaQIVpJlABWkCRZAm'
+    'UEGaCVSQJlBBmolUjCZSMZqJVIxmR4RqJlYRmt0dq4X3At79UDhTbL2TAAAAAElFTkSuQmCC'),
+    # head.gif
+    (84, 56,
+    'iVBORw0KGgoAAAANSUhEUgAAAN4AAAFnCAYAAADJ1fe+AAADG0lEQVR42u3cMY7bUBBEQd7/0lTK'
+    'UAm7P2eqgM6N0X/aNQz4umi6ywORHbLnnxfEdUiUgkRgB/6kBKGJEKEJEYQmRMQmQsRmIkRsIkRw'
+    'JkLEJkAEZwIUnAkQwZkIBWfiQ3AmQMGZAAVnJkDRmQAFZyY+wZkARWcmPsGZAEVnti0+H7AJUHBm'
+    'c+PzQZr4RGc2Oz4fnIlPdGazA/QhmfhEZzY7Ph+KiU90ZrPj8yGY8ERnNjs+hzcTndns+BzarBCf'
+    'I5uF43Ncs3B4DmtWiM9RzcLxOaZZODyHNCvE54hm4fgcz0x4ZvPjczQz4ZnNj8+xzIRnNj8+RzIT'
+    'ntn88BzIrBCf45gJz2x+fI5iJjwz4ZmZ8MzmxOcgZuHwHMNMeGbCM7OX4nMIM+GZzQ/PEcz8Hc/M'
+    'r5pmJjwz4ZmZ8MyEZ2bCM/PveGZ+2vmJZ+ZXTTPhmZlfNc2EZ2bCM/tkeOIzE57ZjuiEZ1YKT3xm'
+    'wrPrPW572OfpOPMiE+NHPmMHmh+ZGIXn4EL0BhxXbCIsvgeHEpsIC+/CscQmwtIbcTDBCbDwThxN'
+    'cAIsvRehCU6AhTcjOARYejuCQ4Cl9yM4BCg8wQlwz1sSHeIrvSXBIUDhiU58e96U4BBg6V2JDvGV'
+    '3pXg8OYcQnTi2/W+RMfWN+cIghPgxjcmOja9Pd8+osMbEx2z354jiI7wu3MEwRF+e76BREf47fn2'
+    'ER3Bt+fbR3SE355vH9ERfnuOIDrC784RREfw3TmC6Ai/O4cQHsH3hujgnACBcHwAAAAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA/Ot2AgAAAAAA'
+    'AAAAAAAAAAAAAIAT+G8gAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAACAt9xOwBf9AGZCWLiT5TS5AAAAAElFTkSuQmCC'),
+    # left_legs.gif
+    (0, 118,
+    'iVBORw0KGgoAAAANSUhEUgAAAJIAAAE0CAYAAADHSWrJAAACbElEQVR42u3dsY7CMBRE0fz/T5sO'
+    'UVAQ2c/xG86R6FZsBHfH2QauiwrDSwAAAG60AYsEQkJICAkhgZAQEgAAAAAAAAAAAAAAAAAAAAAA'
+    'AAAAAP/Gp+QCAAAAAAAAAAAAAAAAAAAAAAAAAAAAMGt8ecBPocw+EI6wOCseUYlny+8hLKCnr4Gm'
+    'AZ12bTQK6OTr5fCAulw/AkJAiEhACAgRISBEJCIEhIhIiAhEhIAQESICEfFkRCAiHGWICBGBiBAR'
+    'IkJEIkJEiIiQkEBEiAgRISLwHxrWCBEhIhEhIkREUEj+kHz4ujXaEI+QROQLa0S0NyC3Ae6Lbgc0'
+    '89wiCg/JkSSi0ogQkYBEJCIhNY6IDS+6iEBApEQkWhEJSUSOM0SEiBARiIiykEBEiAgRISIQESeE'
+    'BNYIESEiRCQi3FxjjRARQhIR1ggR4UgDEeFIwxohInCkYY2wRlgjEBGONKwR1gisESLCkYY1AmuE'
+    'NcIaYY1ARAjJMS6iTvEISUjLAhKSiJYEND5+HiHdCggRuQ8SkoBE1DQihDQVESKyQkKyQiIS0fv5'
+    'CQ/JEomoJCKEJCIRiUhIzd4MEXlDRGSNRERASCISkYiEJCJEhJCEJCIRCUlExIQkIhGJSEiuD2uE'
+    'kEQkJEeakETEkjfOkUbsUSsiHGlYI0SEkESENcIaISJwpGGNEBGONLBGWCOsESICISEi3GBjjcAa'
+    'YY2wRlgjEBFCQkQICUSEkBARQhISIkJIiAiEhIgQEiICIVEZkZCwRggJESEkISEihISIQEiURSQk'
+    'rBFCQkQISUi4ycYaISQAAAAAAAAAAAAAAACgqfECMNBl4Q93l/wAAAAASUVORK5CYII='),
+    # right_legs.gif
+    (15, 57,
+    'iVBORw0KGgoAAAANSUhEUgAAAXoAAAF9CAYAAAAKpaMoAAAFQUlEQVR42u3c3U6DUBCFUd7/peul'
+    'SesPtAeYmb1W0lujaD42R+u2wfUePl8A3AQAAADLHwDhB0D4ARB9AEQfANEHAAAAmMixDoDgAwAA'
+    'Fj4Agg+A4AMg+AAAgHUPAADWPQAAYN0DAAAAcCJHOQBiD4DYAwAAAAAAAAAA3/w1DoDYAyD2AIg9'
+    'AAAAACs4wgEQewAAwKoHQOwBAACrHgAArHoAAMCqBwAArHoAhB4AALDqAQAAADpyfAMg9AAAAAAA'
+    'wEmc0wMAAAAAwD2c0QMAAAAAAAAAAAAAkMTf0QMAAACU5egGAAAAAAAAYDG/iAUAAAAoybENAAAA'
+    'QEmObQAAwJoHAACseQAAwJoHAABrHgAAAIALObIBAAAAKMeRDYDIAyDyAAAAAAAAAAAAAAAAAABw'
+    'lHe8Aog8ACIPAABY8QAAgBUPIPIAAAAAAAAAAAAAAAAAANCMd84CAAAAlOcIBwAAAKA8RzgAAMDr'
+    'U8KqFwAL41wh7MIPMHC1Cz/AkLjf9bEBeAruJxGucIMBYHFgqz5VAPDPqu8QUcEHWBzSzk8fAPyw'
+    '6reGkRR8gNCnEbEHEHyAzEhOj73gA1j3AFb9lOADYN0DWPXWPX7YAOsewNCy7gEQewBWx17wgYgA'
+    'Cj4AYg9g1Ys9AGIPYNWLPQBiD4DYA/waO9dA8AHEHsCqF3sAmsYeALH3aAZohNgDIPYAiD3Ax1Gj'
+    'Sex9swAGx17kAa4Jvd4CbYOG2AOIvdgDZMUeoF3IEHsAsRd7ALEHKB0wxB4Ii9fel2sFEBD7tOCJ'
+    'PRAb+qTwiT0wMlyCL/ZA82id+SSQEnuAuIU7PYJWPSD4ASEUe6BVsK4KvtgDDAh9WvCFHnAjGR57'
+    'qx4gLPYAYi+MAPdE+M7gAxCw7gEQewAmxF7wASx7AN4NrtgDCL3YAyD2AIg9gNiLPYDYAyD2ALyE'
+    'VewBhF7oAYRe7AGEXuwBEHsAsQfAqgdA7AEQe4BRAe0aewCsegDEHoDysQfAqgdA7AEoH3sArHoA'
+    'rHoAxB6Ae0Mv9gBWPQBiD0D50Is9gFUPgFUPgFUPgNgDIPQAiD0Af4Ze7AGsegCsegCsegCseoDL'
+    'Q2jVA4RE0KoHCIngI+DrBIgP/cQgij0g9MNjL/SA6AcEX+wBhgdf6AF2Bl/sAQKCL/QADYKXuu7F'
+    'HhD64ete6AHEHkDsu8de6AGGx97/wAEICKbQA6PjLPZWPSD0kbEHEPphsRd6QOjFHoDusRd6ALEH'
+    'oHvshR7AqgfAqgcoEjOxn/EEAlAm9J1jD8Cw2As9QEBId3+O7gQAVj2A2Is9wNp4ib3QA4ip0ANY'
+    '9QAMiL3AA+2C2iX2AAwLvdgDhNyIxB4gLPYAHAio2AMIfcnQiz3A0BuT0AOIPQBb40g6wgEYHnqr'
+    'HiDkJiX2AGGxB+ApkmIPQLvQiz1AQOwBhNGqB8CqB0DsAarGUOgBEHsAeoRe7IG4CFr1AFj1AFj1'
+    'ACXDZ9UDYNUDWPNWPQBWPQBiD7Awcq6B0AOIPYA1L/QAiD2ANS/0AEIv9gAIPSBm7Ay9awVg1QNY'
+    '81Y9AFY9gDUv9ACIPWDNI/QAiD1gzQs9gMiLPQBCD2DNFw296wpg1QNY80IPgNgDWPNCD4g8Yg+A'
+    '0APWPEIPiLzYAyD0ANa8aw4gOAAAYM0DIPIAAAAAHObIBkDkAQAAAACABZzLA4g8ACIPgMgDAAAA'
+    'AAAAAAAAAAAAHOXNUAAiD4DIAwAAAPABRzUAIg8AAFjxAIg8AAIPgMgDCDwAAGDFAyDwAAg8AAIP'
+    'IPAAAAAAAMCbnL1T0hdpL+5YIfYZ/gAAAABJRU5ErkJggg=='),
+    # left_antenna.gif
+    (4, 0,
+    'iVBORw0KGgoAAAANSUhEUgAAAXwAAAGLCAYAAADEcClrAAADpElEQVR42u3c0WrjQAyGUb//Syu3'
+    'Q3ASMESjkc4BXy2Fbrv95reT7XVRRSwXAEOCHw4AgJnBF3+AgcEXf4DB8Qdg4AEAwLD4AzAs/gAI'
+    'PwCd4w+A8APQNfwACD8Aog+A8AMg+gAUDT8Aog9Ax/ADIPoAiD4Aog+A6AMg+gCIPgCiD4DoAyD6'
+    'AHyKPgBWPgCiD8Cx0QdA9AHoFnzRB7DyAbDyAbDyAbDyAbDyAbDyAbDyARB8AEQfQPAFH0D0ARB8'
+    'AAQfAMEHQPQBEHwABB+A59EHwMoHQPABEHwABB8AwQcgI/pPP/60vy+A4AMwI/iiDwAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA'
+    'AAAAAAAAAAAAAAAAAAAAAAAAAAAwWPgSAAAAAJzCoxwAAAAAoArPKwFEHwDA2AFA7AEQewDEHgCx'
+    'Bz8c4N8z+CEBAAAAAICJPNcHAADAXScAAAAAAAAAAAAAAFTi/fgAAAAAAAAAAAAAAAAAAAAAKeLm'
+    'AgAAAAAA9oovFwAAAAAjeBQEAADdV7TVD+CgAkD4AYD9J3Y8+DMAAIaNRgAAALbcjv26ADgs7ACa'
+    'g28uAOIPIK4AWuWLB4DQAyD0AEIPAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAABA'
+    'MbFcAAAAAAAAAAAAAAAA/EncXABrIwAQfQBEHwDYd2p7hg9Y+gCIvm8MAEIPgNADAAAAAAAAAAAA'
+    'AAAAAAAAANCP330DAAAAAAAAAAAAAAAAAAAAAAAAAFCQXxoJAAAAAACk8cIEgE4CAICV75MHAAAA'
+    'AAAAAAAAAAAAeOP/MwHgBALQWAAAwMoHAACsfAAA4KCV77YCAADcTgAAANY9ADjYAEQQAACw7gEA'
+    'wLoHQKcBcGoAAADWPQAAAAAANONxPAAAAAAAAAAA/XhXDABOKAAAMJwBAADcJgFoFgAA4DYDAMF3'
+    'OAEAYGgDAAAAAAAAsJMXcAEAAAAAAADI59VqAAAAAAAAgGReqAXQRgCcYAAaCQAAWPkAAICVDwAA'
+    'uC0BAACsewAAwLoHAACsewAAwLoH0FcAnD4AAIB1DwAAWPcAAGBoAwAAAAAAAAAAAJDF+z8BDvAC'
+    '/q3IRrqd/A0AAAAASUVORK5CYII='),
+    # right_antenna.gif
+    (234, 2,
+    'iVBORw0KGgoAAAANSUhEUgAAADsAAAA7CAYAAADFJfKzAAAAc0lEQVR42u3YwQ0AIQwDsOy/dG8B'
+    'PveD1JU6gJUgEEnvzGHrgVXY+bH1wCehI8WSM1kPzAbgimsDsu21AwkKCXolNKCgvkJAQUFBQUFT'
+    'PGuh6qu+oOorVVBYUFipgsLCgsLCgsLCShUWFvZVrFRhYWGvmA/U/ETKOIJSUwAAAABJRU5ErkJg'
+    'gg=='),
+    # left_eye.gif
+    (135, 78,
+    'iVBORw0KGgoAAAANSUhEUgAAACcAAAAnCAYAAACMo1E1AAAEHklEQVR42s1YWSisfxge+77vW7IW'
+    'bsgSQqRkiRJKKSXJpVzYLpSi7DcuKEkuEGXJWhIlW9mFLEmJhOz7/vx7f6czjvM3x/d9M8w81zO/'
+    'eeZdn+cViaSEhoYGjIyMYG5uDktLS1hYWMDY2Bja2toQyQNEIjo6GoWFhWhubsbY2BiWl5exubmJ'
+    '1dVVTE9Po6OjA+Xl5UhOToaLiwvU1dW/j6yqqiq8vLxQUlKC2dlZXF9fgwvu7++xs7ODpqYmREVF'
+    'QUdHR7YknZycUFlZib29PUiDi4sLtLW1ITAwEMrKypA6WvHx8VhYWIAssb+/j5ycHOjr6wsjqKWl'
+    'hby8PJycnOA78Pj4iMbGRtjY2IA3seLiYtzd3eG70dXVBTs7O3BOJUXsJ4j9RktLC0xMTL4mmJCQ'
+    'gNPTU/wkXl9fWaYoMBKJOTs7Y3FxEfIABSQmJuZzcioqKqiqqoI8MTIyAjMzs/8T9Pb2Zi0uTzw9'
+    'PSEtLe0jOSUlJZSWlkIRMDw8DAMDg3eC1tbWcqu1z7ZIaGjoOzla4re3t1AUFBUVvZMjdaFIGBwc'
+    'BC0CkZqaGtrb2xWKHMkue3t7iHR1dTE1NaVQ5I6Ojpg8E5GCJaGoSLi5uUFQUBBEtra2WFtbk/kP'
+    'XF1dMVHa2tqKhoYGdHd3M6VMaoTLvAsLCwOT3CsrKzIj9fz8jL6+PraKKCuampqguiZPQXWUmZmJ'
+    'paWlf75BoiM4OBgiEnwzMzMyIfbw8ICKioovFYabmxsGBgYkvkMa0sfHByIyHj09PTIhR+mjBuMi'
+    'zcj0SAoKpZ+sAVtdZWVlUhPb3t6Gu7s7L1WbkpLyqW4cHR2Fnp7er7cSExNZEUqD2tpa0B/lQ44U'
+    'CDXN36iursYHHbe1tSWY2MvLC1JTU3mbFXJgVAp/N0NsbCw+SPP6+nqpzEpERIQgJ0U++E9QHdIE'
+    '+fCh8PBwnJ2dCdZhcXFxvMlRGVAKf+Pt7Q25ubn41HHRaUEIJD7K4c7S29srfoc2lYODw+fv+Pr6'
+    'Ynd3VxDBoaEh3ibZ09NTfEWgs0V6ejr+GeasrCw2TIXsQxoNXInR1qipqRF/n24p4vEhCTRE6+rq'
+    'WKr4Yn19HQEBAeDSpRkZGbi8vGTfGx8fh6OjI7c/RjuRjK5QLUZzU9J9ju53BQUF4jPH3NwcyFzx'
+    'vsHRDBIynCkinZ2dbMmTH/Dz80NkZCTy8/MxMTHB5iKB7npMtwkBFTidJg4PDwUrlPPzcxYlklB/'
+    '3uyoxiR2JleQ2SZt1d/fL7UJorPD/Pw886ZfFj8fGBoaIikpic2l4+Nj3sJzcnIS2dnZv7zBd4G6'
+    '2d/fnx3/yBiRcDw4OGCpow1DNw/yABsbG0yz0XqiejM1Nf3ZAzZtFepsV1dXVvQhISFslHh4eMDK'
+    'yoqztpOE/wAJ+PmYjjSyIwAAAABJRU5ErkJggg=='),
+    # right_eye.gif
+    (142, 78,
+    'iVBORw0KGgoAAAANSUhEUgAAAGsAAAAnCAYAAAAIJbYbAAAEl0lEQVR42u2bWSitbRTHj+ko80xk'
+    'yHChKGQsZHZDXOgoMt6ISIgLKRIKJREHpYSkXKFQXMl0MhXKPEUZj3me/l/rLd93Tmdj73dve3O+'
+    '51f7arfft57/Xs9az1r/58sXhsRQUFCAuro69PT0YGRkxH309fWhoaEB+o6tkIxRU1ODs7MzkpOT'
+    'UVtbi56eHkxMTGB+fh4LCwuYmppCX18f6uvrkZaWBnd3d2hqajLhpImhoSHi4uLQ3d2Nvb09PDw8'
+    '4C0eHx9xcHCA/v5+pKamwtTUlIn2nqiqqiIqKgojIyO4ubkBX0jcyclJJCUlsUh7D2xsbNDU1ITL'
+    'y0tIChK8o6MD9vb2shXs7u7ur/nHeHp64sePH3gvZmZmEBQUxCJMXPz8/Lhi4b3Z2NhAWFgYE4wv'
+    'Li4umJ2dhbRYW1uDr68vE0xUjI2NMTAwAGkzNjYGKysrJpgoB9zS0lI8PT1BFtTV1UFZWZkJJgw+'
+    'Pj7c+UlWnJycICQkhIn1FvSPbmlpgazp6uri2ldMkVegltD+/r7MxTo9PWXl/FsUFhbio1BVVQV5'
+    'eXkmmCC0tLQwODj4YcSanp4G9SGZMgJwcHDAzs7OhxHr6OgI3t7eTCxBUAfh/v4eH4n4+HgmliDS'
+    '09NldrZ6ifz8fNmKRZ1rVlywIkMsysrKJL7YNLuinh8NKhsbG9Ha2srNw46Pj4X6fUNDg+xtAR8x'
+    'cRYVFUlUqKWlJWRlZcHa2ho0uFRSUuLaSLq6uqBufltbG66url59Rk1NDf/IKi8v/2tDMjs7W2JC'
+    'UfS4ubm9ulbk4cjJycHZ2dmLzykuLmZboCAiIyM5r4S4LC8vw9XVVahFpmgjQV56L43+mTICoEj4'
+    '+fOn2DkqMzNTpAU2MTHB+Pj4H8+6uLhAYGCgdMQyMDD4VP8K6hYIWjRRWFlZAfk1RH13Xl7eH88i'
+    'S5u5uTmLLEHIycmhurpaLLHIO/j161eRFzggIADX19e/Pau5uZkrSpgyLxAcHIzz83PeYpEDik/1'
+    '5uTk9NsWTM6nb9++MaFeg3x8vb29vMVqb2/ndS6ifPlrVTg0NITPlkZkQkREBO/oGh0dhba2tsiL'
+    'HB0d/a+zl6IqMTGRCSUMKioqvKfF1Jmg/CPK+yjHUX56prOzEzSuEaufR9bh/4tgdnZ2mJub470V'
+    '0oFX2HdReU4++Gc7moeHh/TXmYwfn1mw8PBwXvMt2sZyc3OFcijZ2tpy3Y7nqIyNjRX8GxoHsE3v'
+    '9VKecsfh4aHIgtGBllpzZmZmAteYhCSPxbNQVFxkZGRAUVGRacIXKsNjYmKwtbUlsmDUQqLbIgUF'
+    'BZy1jCo+amAnJCRwOfF56yPbW0pKCjtTSSrC/P39uXKa73CSqkuKUBrV06WNX30WoaGhbGYlaegC'
+    'XElJCba3t8Vu9lI0VVZW8mpNMYSEDrx0NbWiogKLi4u4vb0VWiCKqNXVVXz//p3bDqWy7e3u7oKJ'
+    'pgBLS0sun9GAkCxs6+vrnEGUtjr6UE7a3NzE8PAwd6+YihWKJJkUEcze+59w1LWgDrmjoyPo8p2X'
+    'lxeo32dhYQEdHR2xBfoH8PgWaZm+C2oAAAAASUVORK5CYII='),
+)
+
+
+def _read_gif(data):
+    """Decodes the first frame of a GIF into (width, height, rgba rows)"""
+    width, height, flags = struct.unpack_from('<HHB', data, 6)
+    pos = 13
+    palette = []
+    if flags & 0x80:
+        palette = [data[pos + 3 * i:pos + 3 * i + 3] for i in range(2 << (flags & 7))]
+        pos += 3 * len(palette)
+    transparent = None
+    while data[pos] == 0x21:  # extension blocks
+        if data[pos + 1] == 0xF9 and data[pos + 3] & 1:  # graphic control
+            transparent = data[pos + 6]
+        pos += 2
+        while data[pos]:
+            pos += data[pos] + 1
+        pos += 1
+    left, top, frame_width, frame_height, flags = struct.unpack_from('<HHHHB', data, pos + 1)
+    pos += 10
+    if flags & 0x80:
+        palette = [data[pos + 3 * i:pos + 3 * i + 3] for i in range(2 << (flags & 7))]
+        pos += 3 * len(palette)
+    code_size = data[pos]
+    pos += 1
+    codes = bytearray()
+    while data[pos]:
+        codes += data[pos + 1:pos + 1 + data[pos]]
+        pos += data[pos] + 1
+    if flags & 0x40 or (left, top, frame_width, frame_height) != (0, 0, width, height):
+        raise ValueError("only whole, non interlaced frames are supported")
+    pixels = _lzw_decode(codes, code_size)
+    colours = [bytes(rgb) + (b'\x00' if i == transparent else b'\xff')
+               for i, rgb in enumerate(palette)]
+    rows = [b''.join(colours[index] for index in pixels[y * width:(y + 1) * width])
+            for y in range(height)]
+    return width, height, rows
+
+
+def _lzw_decode(codes, code_size):
+    clear = 1 << code_size
+    table = [bytes([i]) for i in range(clear)] + [b'', b'']
+    size = code_size + 1
+    out = bytearray()
+    prev = None
+    bits = count = 0
+    for byte in codes:
+        bits |= byte << count
+        count += 8
+        while count >= size:
+            code = bits & ((1 << size) - 1)
+            bits >>= size
+            count -= size
+            if code == clear:
+                table = table[:clear + 2]
+                size = code_size + 1
+                prev = None
+                continue
+            if code == clear + 1:
+                return bytes(out)
+            if prev is None:
+                entry = table[code]
+            else:
+                entry = table[code] if code < len(table) else prev + prev[:1]
+                table.append(prev + entry[:1])
+            out += entry
+            prev = entry
+            if len(table) == 1 << size and size < 12:
+                size += 1
+    return bytes(out)
+
+
+def _write_png(width, height, rows):
+    """Encodes rgba rows as a PNG"""
+    def chunk(kind, body):
+        return struct.pack('>I', len(body)) + kind + body + \
+            struct.pack('>I', zlib.crc32(kind + body))
+    raw = b''.join(b'\x00' + row for row in rows)
+    return (b'\x89PNG\r\n\x1a\n' +
+            chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 6, 0, 0, 0)) +
+            chunk(b'IDAT', zlib.compress(raw, 9)) + chunk(b'IEND', b''))
+
+
+def _opaque(image, left, top):
+    """Board positions of the opaque pixels of image placed at left, top"""
+    width, height, rows = image
+    return {(left + x, top + y) for y, row in enumerate(rows)
+            for x in range(width) if row[4 * x + 3]}
+
+
+def _placements(images, board_width, board_height):
+    """Top left corner of every image on the board
+
+    Images grow upwards and sideways as parts are added, so every image
+    sits on the bottom edge of the board, and is moved sideways to where it
+    best covers the image after it."""
+    corners = [None] * len(images)
+    width, height, _ = images[-1]
+    corners[-1] = (board_width - width, board_height - height)
+    for i in range(len(images) - 2, -1, -1):
+        width, height, _ = images[i]
+        top = board_height - height
+        after = _opaque(images[i + 1], *corners[i + 1])
+        opaque = _opaque(images[i], 0, top)
+        corners[i] = max(range(board_width - width + 1),
+                         key=lambda left: len(after & {(x + left, y) for x, y in opaque})), top
+    return corners
+
+
+def _part_layers(images):
+    """(x, y, png) of the pixels each stage adds to the one before it"""
+    board_width = max(width for width, _, _ in images)
+    board_height = max(height for _, height, _ in images)
+    corners = _placements(images, board_width, board_height)
+    board = [bytearray(4 * board_width) for _ in range(board_height)]
+    layers = []
+    for (width, height, rows), (left, top) in zip(images[1:], corners[1:]):
+        added = {}  # (x, y) on the board: rgba
+        for y, row in enumerate(rows):
+            line = board[top + y]
+            for x in range(width):
+                pixel = row[4 * x:4 * x + 4]
+                if pixel[3] and line[4 * (left + x):4 * (left + x) + 4] != pixel:
+                    added[left + x, top + y] = pixel
+                    line[4 * (left + x):4 * (left + x) + 4] = pixel
+        x0 = min(x for x, _ in added)
+        y0 = min(y for _, y in added)
+        x1 = max(x for x, _ in added) + 1
+        y1 = max(y for _, y in added) + 1
+        rows = [b''.join(added.get((x, y), b'\x00' * 4) for x in range(x0, x1))
+                for y in range(y0, y1)]
+        layers.append((x0, y0, _write_png(x1 - x0, y1 - y0, rows)))
+    return (board_width, board_height), layers
+
+
+def _wrap(data):
+    data = base64.b64encode(data).decode()
+    return '\n'.join("    '" + data[i:i + 76] + "'" for i in range(0, len(data), 76))
+
+
+def generate():
+    """Rewrites the layers of this module from the contents of STAGE_FILES"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    with open(__file__) as module:
+        source = module.read()
+    head, rest = source.split('# Size of a board holding a complete beetle\n', 1)
+    tail = rest[rest.index('\n\n\ndef _read_gif'):]
+    images = []
+    for name in STAGE_FILES:
+        with open(os.path.join(here, name), 'rb') as gif:
+            images.append(_read_gif(gif.read()))
+    board_size, layers = _part_layers(images)
+    parts = ['    # ' + name + '\n    ({}, {},\n'.format(x, y) + _wrap(png) + '),\n'
+             for name, (x, y, png) in zip(STAGE_FILES[1:], layers)]
+    with open(__file__, 'w') as module:
+        module.write(head + '# Size of a board holding a complete beetle\n' +
+                     'BOARD_SIZE = {!r}\n\n'.format(board_size) +
+                     'PART_LAYERS = (\n' + ''.join(parts) + ')' + tail)
+
+
+if __name__ == "__main__":
+    generate()
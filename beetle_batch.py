@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""Vectorized Monte Carlo simulation of the dice game Beetle
+
+Plays a whole batch of games at once. The board of every player in every
+game is kept as a single build state of the rules in a NumPy array, and all
+the dice for a round are rolled in one call. Follows the same rules as
+Beetle.turn in beetle_cli.py, for the standard game or any Rules variant.
+
+simulate_skip skips the rolls that build nothing: it samples how many
+turns each build state takes instead of rolling for every turn."""
+
+from collections import namedtuple
+import sys
+
+import numpy as np
+
+from beetle_cli import RULES
+
+BatchResult = namedtuple('BatchResult', ['winners', 'rounds'])
+BatchResult.__doc__ = """Outcome of every game in a batch.
+
+winners holds the index of the winning player, rounds holds the number of
+rounds played, counting the round the game was won in."""
+
+
+def needed_rolls(rules) -> np.ndarray:
+    """The roll that moves each state on, for rules where every part follows
+    the one before. The finished beetle gets 0, which no roll matches"""
+    needed = [0] * rules.num_states
+    for state in range(rules.num_states):
+        for roll in rules.moving_rolls(state):
+            needed[state] = roll
+    return np.array(needed, dtype=np.int8)
+
+
+def simulate(num_games, num_players=2, seed=None, rules=RULES) -> BatchResult:
+    """Plays num_games games of num_players players each.
+
+    Games are removed from the batch as soon as they are won, so every round
+    only touches games that are still being played. When the parts go on in
+    a fixed order, a state moves on to the next one on a single roll, so a
+    turn is one comparison; otherwise it is a lookup in the flattened
+    transition table."""
+    rng = np.random.default_rng(seed)
+    state_type = np.int8 if rules.num_states <= 127 else np.int16
+    stages = np.zeros((num_games, num_players), dtype=state_type)
+    winners = np.empty(num_games, dtype=np.int32)
+    rounds = np.empty(num_games, dtype=np.int32)
+    active = np.arange(num_games)
+    round_num = 0
+    width = rules.num_sides + 1
+    if rules.chain:
+        needed = needed_rolls(rules)
+    else:
+        table = np.array(rules.transitions, dtype=state_type).ravel()
+
+    while active.size:
+        round_num += 1
+        rolls = rng.integers(1, rules.num_sides + 1, size=stages.shape, dtype=np.int8)
+        if rules.chain:
+            stages += rolls == needed.take(stages)
+        else:
+            stages = table.take(stages.astype(np.intp) * width + rolls)
+
+        # Players take their turns in seat order, so the first finished
+        # player in a game is the one that wins it
+        done = stages == rules.complete_state
+        if not done.any():
+            continue
+        won = done[:, 0].copy()
+        for seat in range(1, num_players):
+            won |= done[:, seat]
+        winners[active[won]] = done[won].argmax(axis=1)
+        rounds[active[won]] = round_num
+        active = active[~won]
+        stages = stages[~won]
+
+    return BatchResult(winners, rounds)
+
+
+def progress_chances(rules=RULES) -> np.ndarray:
+    """Chance of building a part in one turn at each unfinished state"""
+    return np.array([len(rules.moving_rolls(state)) / rules.num_sides
+                     for state in range(rules.num_states) if not rules.complete[state]])
+
+
+def simulate_skip(num_games, num_players=2, seed=None, rules=RULES) -> BatchResult:
+    """Plays num_games games of num_players players each by skipping ahead.
+
+    The number of turns until a state builds a part is geometric. Drawing
+    one waiting time per part gives the turn each player finishes on, which
+    is the round they would win in. The earliest round wins, and on a tie
+    the lower seat wins because it rolls first, exactly as in Game.turn.
+    Takes a draw per part and player instead of a roll per turn.
+
+    Where a state can build one of several parts, the part built is drawn
+    too, from the faces that build something, all equally likely."""
+    rng = np.random.default_rng(seed)
+    finish = np.zeros((num_games, num_players), dtype=np.int32)
+    if rules.chain:
+        for chance in progress_chances(rules):
+            finish += rng.geometric(chance, size=finish.shape).astype(np.int32)
+    else:
+        # states reached by each face that builds a part, padded to a table
+        moving = [[rules.transitions[state][roll] for roll in rules.moving_rolls(state)]
+                  for state in range(rules.num_states)]
+        count = np.array([len(targets) for targets in moving])
+        targets = np.zeros((rules.num_states, count.max()), dtype=np.intp)
+        for state, row in enumerate(moving):
+            targets[state, :len(row)] = row
+        chance = count / rules.num_sides
+        states = np.zeros(finish.shape, dtype=np.intp)
+        # every step builds one part
+        for _ in range(rules.num_parts):
+            finish += rng.geometric(chance[states]).astype(np.int32)
+            pick = rng.integers(0, count[states])
+            states = targets[states, pick]
+    winners = finish.argmin(axis=1).astype(np.int32)  # first seat on a tie
+    rounds = finish.min(axis=1)
+    return BatchResult(winners, rounds)
+
+
+def summary(result, num_players=None) -> dict:
+    """Win rate of each seat and game length statistics of a batch"""
+    if num_players is None:
+        num_players = int(result.winners.max()) + 1
+    wins = np.bincount(result.winners, minlength=num_players)
+    return {
+        'games': len(result.winners),
+        'win_rate': (wins / len(result.winners)).tolist(),
+        'mean_rounds': float(result.rounds.mean()),
+        'median_rounds': float(np.median(result.rounds)),
+        'max_rounds': int(result.rounds.max()),
+    }
+
+
+def main():
+    """Simulates a batch given on the command line and prints a summary
+
+    Usage: beetle_batch.py [games] [players] [seed] [skip]"""
+    num_games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    num_players = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    seed = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    engine = simulate_skip if sys.argv[4:5] == ['skip'] else simulate
+    result = engine(num_games, num_players, seed)
+    for key, value in summary(result, num_players).items():
+        print(key, value)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""Benchmarks for the dice game Beetle
+
+Measures rolls/sec for Die.roll, turns/sec for Beetle.turn, games/sec for
+Game.round in beetle_cli.py and turns/sec for a CanvasBeetle drawn on a
+BoardView, plus the peak memory of a game in progress. Results are written
+as JSON, and two result files can be compared to find slowdowns.
+
+Usage: beetle_bench.py [--out FILE] [--quick]
+       beetle_bench.py compare OLD NEW [--threshold FRACTION]"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import beetle_cli
+from beetle_cli import Beetle, DiceStream, Die, Game
+from beetle_events import SILENT
+
+REPEATS = 5  # each benchmark keeps the best of this many runs
+
+
+def best_rate(func, count, repeats=REPEATS) -> float:
+    """Best operations/sec of func, which performs count operations a call"""
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(count)
+        best = min(best, time.perf_counter() - start)
+    return count / best
+
+
+def bench_die_roll(count):
+    """Rolls a Die count times"""
+    roll = Die().roll
+    for _ in range(count):
+        roll()
+
+
+def bench_dice_stream_roll(count):
+    """Rolls a DiceStream count times"""
+    roll = DiceStream(seed=1).roll
+    for _ in range(count):
+        roll()
+
+
+def bench_beetle_turn(count):
+    """Takes count turns of silent Beetles"""
+    # A new beetle every 48 rolls, the average number needed to finish one
+    stream = DiceStream(seed=2)
+    rolls = [stream.roll() for _ in range(48)]
+    for _ in range(count // len(rolls)):
+        turn = Beetle(sink=SILENT).turn
+        for roll in rolls:
+            turn(roll)
+
+
+def bench_game_round(count):
+    """Plays count silent two player games"""
+    die = DiceStream(seed=3)
+    for _ in range(count):
+        game = Game(2, die=die, sink=SILENT)
+        while not game.round():
+            pass
+
+
+class _StubCanvas:
+    """Stands in for the Canvas of a BoardView, accepting every update"""
+
+    def create_text(self, x, y, **options):
+        return 0
+
+    create_image = create_text
+
+    def __setitem__(self, option, value):
+        pass
+
+    def canvasy(self, y):
+        return y
+
+    def coords(self, item, x, y):
+        pass
+
+    def itemconfigure(self, item, options):
+        pass
+
+
+class _Configure:
+    """Stands in for the Configure event of a 1000 by 1000 pixel canvas"""
+    width = 1000
+    height = 1000
+
+
+class _StubRoot:
+    """Stands in for the widget the Renderer schedules its redraws on"""
+
+    def after_idle(self, func):
+        pass  # the benchmark flushes the renderer itself
+
+
+def bench_tk_draw(count):
+    """Takes count turns of CanvasBeetles that each build a part, drawing
+    every one on a BoardView with a stand-in canvas"""
+    # Imported here so the other benchmarks run where tkinter is missing
+    from beetle import Renderer
+    from beetle_rules import STANDARD
+    from beetle_tk import BoardView, CanvasBeetle
+    renderer = Renderer(_StubRoot())
+    # only the drawing code runs: no Frame, widgets or decoded images
+    board = BoardView.__new__(BoardView)
+    board._init_layout(2, renderer, 1, STANDARD, [object()] * STANDARD.num_parts)
+    board._canvas = _StubCanvas()
+    board._resize(_Configure())
+    flush = renderer.flush
+    # rolls that build every part, so each turn draws and then redraws
+    rolls = [roll for _, roll in beetle_cli.PARTS]
+    for _ in range(count // len(rolls)):
+        turn = CanvasBeetle(board=board, sink=SILENT).turn
+        for roll in rolls:
+            turn(roll)
+            flush()
+
+
+def peak_game_memory(num_games=1000) -> float:
+    """Peak bytes per game while num_games two player games are in progress"""
+    die = DiceStream(seed=4)
+    tracemalloc.start()
+    games = [Game(2, die=die, sink=SILENT) for _ in range(num_games)]
+    for game in games:
+        for _ in range(10):
+            game.round()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / num_games
+
+
+BENCHMARKS = {
+    'die_roll': (bench_die_roll, 200000),
+    'dice_stream_roll': (bench_dice_stream_roll, 200000),
+    'beetle_turn': (bench_beetle_turn, 200000),
+    'game_round': (bench_game_round, 2000),
+    'tk_draw': (bench_tk_draw, 200000),
+}
+
+
+def run(quick=False) -> dict:
+    """Runs every benchmark and returns the results"""
+    rates = {}
+    for name, (func, count) in BENCHMARKS.items():
+        if quick:
+            count //= 10
+        try:
+            rates[name] = best_rate(func, count)
+        except ImportError as err:
+            print('skipping', name + ':', err, file=sys.stderr)
+            continue
+        print('{:<20} {:>14,.0f} /sec'.format(name, rates[name]), file=sys.stderr)
+    memory = peak_game_memory()
+    print('{:<20} {:>14,.0f} bytes'.format('memory_per_game', memory), file=sys.stderr)
+    return {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'time': time.time(),
+        'rates': rates,
+        'memory_per_game': memory,
+    }
+
+
+def compare(old, new, threshold=0.1) -> list:
+    """Names of benchmarks that got slower by more than threshold
+
+    A rate counts as slower when it fell below (1 - threshold) of the old
+    rate, and memory when it grew above (1 + threshold) of the old amount."""
+    slower = []
+    for name, old_rate in old['rates'].items():
+        new_rate = new['rates'].get(name)
+        if new_rate is None:
+            continue
+        change = new_rate / old_rate - 1
+        flag = 'SLOWER' if change < -threshold else ''
+        print('{:<20} {:>+8.1%} {}'.format(name, change, flag))
+        if flag:
+            slower.append(name)
+    change = new['memory_per_game'] / old['memory_per_game'] - 1
+    flag = 'LARGER' if change > threshold else ''
+    print('{:<20} {:>+8.1%} {}'.format('memory_per_game', change, flag))
+    if flag:
+        slower.append('memory_per_game')
+    return slower
+
+
+def main():
+    """Runs the benchmarks, or compares two earlier runs"""
+    if sys.argv[1:2] == ['compare']:
+        parser = argparse.ArgumentParser(prog='beetle_bench.py compare',
+                                         description="Compare two benchmark results")
+        parser.add_argument('old')
+        parser.add_argument('new')
+        parser.add_argument('--threshold', type=float, default=0.1,
+                            help="fraction of change to flag (default 0.1)")
+        args = parser.parse_args(sys.argv[2:])
+        with open(args.old) as old, open(args.new) as new:
+            slower = compare(json.load(old), json.load(new), args.threshold)
+        sys.exit(1 if slower else 0)
+
+    parser = argparse.ArgumentParser(description="Benchmark Beetle")
+    parser.add_argument('--out', default=None, help="write results to this JSON file")
+    parser.add_argument('--quick', action='store_true', help="run a tenth of the iterations")
+    args = parser.parse_args()
+    results = run(args.quick)
+    if args.out:
+        with open(args.out, 'w') as out:
+            json.dump(results, out, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Persistent cache of Beetle outcome statistics
+
+Answers questions like "how often does seat 3 of 5 win" or "how long is a
+game with a d8" once, then keeps the answer in a local SQLite file. Two
+kinds of result are cached:
+
+    exact       win chances and game length from beetle_markov
+    simulated   a CampaignStats snapshot of games played with Game
+
+Results are keyed by the rules fingerprint, die sides and number of
+players, and simulated ones also by seed and number of games. Rules whose
+definition changes get a new fingerprint, so their old results are never
+returned and age out; a change of RULES_VERSION or of the cache layout
+empties the file when it is opened.
+
+Game number n of a seeded campaign rolls its own CounterRandom stream, so
+the first n games are the same whatever the campaign's size. A simulated
+query for more games than the largest cached run of the same seed carries
+on from that run, playing only the games it lacks, and gives exactly what
+playing them all from scratch would.
+
+Recently used results are also kept decoded in memory, so a repeated query
+is a dict lookup. The file is capped at max_bytes of results, evicting the
+least recently used first. Reads only record their use in memory; it goes
+to the file with the next write or on close."""
+
+import argparse
+from collections import OrderedDict
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from beetle_cli import RULES, RULES_VERSION, Game
+from beetle_rules import load_rules
+from beetle_rng import game_die
+from beetle_stats import CampaignStats, StatsSink
+import beetle_markov
+
+CACHE_VERSION = 3  # bump whenever the layout of the file or its results change
+DEFAULT_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'beetle', 'results.sqlite')
+MAX_BYTES = 64 * 1024 * 1024  # results kept in the file, not counting SQLite overhead
+MEMORY_ENTRIES = 256  # results kept decoded in memory
+
+
+class ResultCache:
+    """Outcome statistics of Beetle games, kept in an SQLite file
+
+    The dicts returned are shared with the cache and must not be changed."""
+
+    def __init__(self, path=DEFAULT_PATH, max_bytes=MAX_BYTES, memory_entries=MEMORY_ENTRIES):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._memory = OrderedDict()  # (family, games): result, oldest first
+        self._memory_entries = memory_entries
+        self._touched = {}  # (family, games): time of last use, not yet written
+        self._db = sqlite3.connect(path, timeout=30.0)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._open()
+
+    def _open(self):
+        """Creates the tables, emptying the cache if it was made by other code"""
+        db = self._db
+        with db:
+            db.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            made_by = dict(db.execute('SELECT key, value FROM meta'))
+            current = {'cache_version': str(CACHE_VERSION), 'rules_version': str(RULES_VERSION)}
+            if made_by != current:
+                db.execute('DROP TABLE IF EXISTS results')
+                db.execute('DELETE FROM meta')
+                db.executemany('INSERT INTO meta VALUES (?, ?)', current.items())
+            db.execute('CREATE TABLE IF NOT EXISTS results ('
+                       'family TEXT, games INTEGER, value TEXT, size INTEGER, used REAL, '
+                       'PRIMARY KEY (family, games))')
+            db.execute('CREATE INDEX IF NOT EXISTS results_used ON results (used)')
+
+    @staticmethod
+    def _family(kind, num_players, rules, seed=None) -> str:
+        family = '{}:{}:d{}:p{}'.format(kind, rules.fingerprint, rules.num_sides, num_players)
+        return family if seed is None else family + ':s{}'.format(seed)
+
+    def exact(self, num_players=2, rules=RULES) -> dict:
+        """Exact win chance of every seat and length of a game, from the
+        Markov chain of rules"""
+        key = (self._family('exact', num_players, rules), 0)
+        result = self._get(key)
+        if result is None:
+            lengths = beetle_markov.game_length(num_players, rules)
+            result = {
+                'win_rate': beetle_markov.win_probabilities(num_players, rules),
+                'expected_turns': beetle_markov.expected_turns(rules),
+                'mean_rounds': sum(t * p for t, p in enumerate(lengths)),
+                'median_rounds': _median(lengths),
+            }
+            self._put(key, {'result': result})
+        return result
+
+    def simulated(self, num_players=2, games=10000, seed=0, rules=RULES) -> dict:
+        """Snapshot of the CampaignStats of the first games games of the
+        campaign played with seed, the numbers beetle_stats.py reports"""
+        family = self._family('simulated', num_players, rules, seed)
+        key = (family, games)
+        result = self._get(key)
+        if result is not None:
+            return result
+
+        stats, played = CampaignStats(rules), 0
+        row = self._db.execute('SELECT games, value FROM results WHERE family = ? AND games < ? '
+                               'ORDER BY games DESC LIMIT 1', (family, games)).fetchone()
+        if row is not None:
+            played = row[0]
+            stats = CampaignStats.from_dict(json.loads(row[1])['state'])
+            self._touched[(family, played)] = time.time()
+        sink = StatsSink(stats)
+        for number in range(played, games):
+            game = Game(num_players, die=game_die(seed, number, rules.num_sides),
+                        sink=sink.start_game(num_players), rules=rules)
+            while not game.round():
+                pass
+        result = stats.snapshot()
+        self._put(key, {'result': result, 'state': stats.to_dict()})
+        return result
+
+    def _get(self, key):
+        """Cached result for key, None if there is none"""
+        result = self._memory.get(key)
+        if result is not None:
+            self._memory.move_to_end(key)
+        else:
+            row = self._db.execute('SELECT value FROM results WHERE family = ? AND games = ?',
+                                   key).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            result = json.loads(row[0])['result']
+            self._remember(key, result)
+        self.hits += 1
+        self._touched[key] = time.time()
+        return result
+
+    def _remember(self, key, result):
+        self._memory[key] = result
+        if len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
+
+    def _put(self, key, value):
+        """Stores value for key, then evicts the least recently used
+        results until the cache fits in max_bytes"""
+        text = json.dumps(value, separators=(',', ':'))
+        db = self._db
+        evicted = []
+        with db:
+            self._write_touched()
+            db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                       key + (text, len(text), time.time()))
+            total = db.execute('SELECT TOTAL(size) FROM results').fetchone()[0]
+            if total > self.max_bytes:
+                for family, games, size in db.execute(
+                        'SELECT family, games, size FROM results ORDER BY used'):
+                    if total <= self.max_bytes:
+                        break
+                    evicted.append((family, games))
+                    total -= size
+                db.executemany('DELETE FROM results WHERE family = ? AND games = ?', evicted)
+                for evicted_key in evicted:
+                    self._memory.pop(evicted_key, None)
+        if key not in evicted:  # a result bigger than the whole cache isn't kept
+            self._remember(key, value['result'])
+
+    def _write_touched(self):
+        if self._touched:
+            self._db.executemany('UPDATE results SET used = ? WHERE family = ? AND games = ?',
+                                 [(used,) + key for key, used in self._touched.items()])
+            self._touched.clear()
+
+    def info(self) -> dict:
+        """Number of results and their total size in the file"""
+        count, size = self._db.execute('SELECT COUNT(*), TOTAL(size) FROM results').fetchone()
+        return {'results': count, 'bytes': int(size), 'max_bytes': self.max_bytes,
+                'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """Forgets every cached result"""
+        with self._db:
+            self._db.execute('DELETE FROM results')
+        self._memory.clear()
+        self._touched.clear()
+
+    def close(self):
+        """Records which results were used, then closes the file"""
+        with self._db:
+            self._write_touched()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _median(lengths) -> int:
+    """Round by which half of all games are won, given the chance of each round"""
+    total = 0.0
+    for rounds, chance in enumerate(lengths):
+        total += chance
+        if total >= 0.5:
+            return rounds
+    return len(lengths) - 1
+
+
+def main():
+    """Answers one query from the cache, filling it in if needed"""
+    parser = argparse.ArgumentParser(description="Cached outcome statistics of Beetle")
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    parser.add_argument('--games', type=int, default=None,
+                        help="simulate this many games instead of solving exactly")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the simulated campaign")
+    parser.add_argument('--cache', default=DEFAULT_PATH, help="cache file")
+    parser.add_argument('--max-bytes', type=int, default=MAX_BYTES,
+                        help="size of the results kept in the cache file")
+    parser.add_argument('--clear', action='store_true', help="empty the cache first")
+    args = parser.parse_args()
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    with ResultCache(args.cache, args.max_bytes) as cache:
+        if args.clear:
+            cache.clear()
+        start = time.perf_counter()
+        if args.games is None:
+            result = cache.exact(args.players, rules)
+        else:
+            result = cache.simulated(args.players, args.games, args.seed, rules)
+        elapsed = time.perf_counter() - start
+        print(json.dumps(result, indent=2))
+        info = cache.info()
+        print('{} in {:.6f}s, {results} results in {bytes:,} bytes'.format(
+            'hit' if info['hits'] else 'miss', elapsed, **info), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
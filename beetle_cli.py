@@ -5,103 +5,106 @@
 
 The dice game Beetle, developed using Python 3.6.1"""
 
-from random import randint
+import argparse
+from random import Random, randint
 import signal
 import sys  # For capturing Ctrl+C
 import os
+import secrets
+
+from beetle_events import CONSOLE, SILENT
+from beetle_rules import PARTS, STANDARD, load_rules
 
 class Die:
     """Die that can roll between 1 and given number. Default of 6 sides"""
 
-    def __init__(self, num_sides=6):
-        """Default number of sides is 6"""
+    def __init__(self, num_sides=6, rng=None):
+        """Default number of sides is 6.
+
+        Rolls come from the random module unless rng, any Random such as
+        a seeded Random or a CounterRandom, is given"""
         self.__num_sides = num_sides
+        self.__randint = randint if rng is None else rng.randint
 
 
     def roll(self) -> int:
         """Generates a random number"""
-        return randint(1, self.__num_sides)
+        return self.__randint(1, self.__num_sides)
+
+
+class DiceStream:
+    """Die that hands out rolls from blocks generated ahead of time.
+
+    Can be used anywhere a Die is. Rolls come from a private Random, or rng
+    if given, so a seed always gives the same sequence of rolls, whatever
+    the block size."""
+
+    def __init__(self, num_sides=6, seed=None, block_size=4096, rng=None):
+        """Default number of sides is 6, rolls are generated 4096 at a time"""
+        self.__rng = rng if rng is not None else Random(seed)
+        self.__faces = range(1, num_sides + 1)
+        self.__block_size = block_size
+        self.__rolls = iter(())
+
+    def roll(self) -> int:
+        """Takes the next roll, generating a new block when this one runs out"""
+        try:
+            return next(self.__rolls)
+        except StopIteration:
+            # choices draws one random() per roll, in order, so blocks of any
+            # size cut the same sequence in different places
+            self.__rolls = iter(self.__rng.choices(self.__faces, k=self.__block_size))
+            return next(self.__rolls)
+
+
+RULES = STANDARD  # rules played unless others are given, see beetle_rules
+COMPLETE = RULES.complete_state  # build stage of a finished beetle
+
+# TRANSITIONS[stage][roll] is the build stage after rolling roll on a six
+# sided die at stage. Stage n means the first n parts of PARTS have been built.
+TRANSITIONS = RULES.transitions
+RULES_VERSION = 1  # bump whenever the standard rules change
 
 
 class Beetle:
     """The core class of this program.
 
-    Holds data related to game state for a single player."""
+    Holds data related to game state for a single player.
+    Progress is kept as a build stage, a state of the rules' tables, which
+    under the standard rules is the number of parts built so far."""
 
-    def __init__(self, name=None):
-        """Creates a new gameboard for a player"""
+    __slots__ = ('name', '_stage', '_sink', '_rules')
+
+    def __init__(self, name=None, sink=CONSOLE, rules=RULES):
+        """Creates a new gameboard for a player, reporting parts built to sink"""
         self.name = name
-        self.__body = False
-        self.__head = False
-        self.__left_legs = False
-        self.__right_legs = False
-        self.__left_antenna = False
-        self.__right_antenna = False
-        self.__left_eye = False
-        self.__right_eye = False
+        self._stage = 0
+        self._sink = sink
+        self._rules = rules
 
+    @property
+    def stage(self) -> int:
+        """Build stage, the number of parts built so far under the standard rules"""
+        return self._stage
 
     def turn(self, roll) -> bool:
         """Represents the act of taking a turn in the game.
 
         Moves forward a step in the state machine"""
+        before = self._stage
+        stage = self._rules.transitions[before][roll]
+        if stage == before:
+            return False  # we didn't move forward in the state machine
 
-        # Create the body if 1 is rolled
-        if not self.__body and roll == 1:
-            print(self.name, "rolled a 1, built body")
-            self.__body = True
-            return True
-
-        # Create the head if 2 is rolled once 1 has already been rolled
-        if self.__body and not self.__head and roll == 2:
-            print(self.name, "rolled a 2, built head")
-            self.__head = True
-            return True
-
-        # Create the left legs if 3 is rolled
-        if self.__head and not self.__left_legs and roll == 3:
-            print(self.name, "rolled a 3, built left legs")
-            self.__left_legs = True
-            return True
-
-        # Create the right legs if 3 is rolled
-        if self.__left_legs and not self.__right_legs and roll == 3:
-            print(self.name, "rolled a 3, built right legs")
-            self.__right_legs = True
-            return True
-
-        # Create the left antenna if 4 is rolled
-        if self.__right_legs and not self.__left_antenna and roll == 4:
-            print(self.name, "rolled a 4, built left antenna")
-            self.__left_antenna = True
-            return True
-
-        # Create the right antenna if 4 is rolled
-        if self.__left_antenna and not self.__right_antenna and roll == 4:
-            print(self.name, "rolled a 4, built right antenna")
-            self.__right_antenna = True
-            return True
-
-        # Create the left eye if 5 is rolled
-        if self.__right_antenna and not self.__left_eye and roll == 5:
-            print(self.name, "rolled a 5, built left eye")
-            self.__left_eye = True
-            return True
-
-        # Create the right eye if 5 is rolled
-        if self.__left_eye and not self.__right_eye and roll == 5:
-            print(self.name, "rolled a 5, built right eye")
-            self.__right_eye = True
-            return True
-
-        return False  # we didn't move forward in the state machine
+        self._stage = stage
+        if self._sink.enabled:
+            self._sink.part_built(self.name, roll, self._rules.part_name(before, roll))
+        return True
 
     def __str__(self) -> str:
         """Pretty string representation of the beetle"""
-        percent_complete = sum([self.__body, self.__head,
-                                self.__left_legs, self.__right_legs,
-                                self.__left_antenna, self.__right_antenna,
-                                self.__left_eye, self.__right_eye]) * 100 / 8
+        rules = self._rules
+        percent_complete = rules.num_built[self._stage] * 100 / rules.num_parts
         return '{} is {}% complete'.format(self.name, percent_complete)
 
     def print(self):
@@ -110,59 +113,78 @@ class Beetle:
 
     def complete(self) -> bool:
         """Returns true if beetle is complete and the game has been won"""
-        return self.__body and self.__head and \
-               self.__left_legs and self.__right_legs and \
-               self.__left_antenna and self.__right_antenna and \
-               self.__left_eye and self.__right_eye
+        return self._stage == self._rules.complete_state
 
 
 class Game:
     """Class representing a single game.
 
     One instance will be created for each new game."""
-    def __init__(self, num_players=2):
-        """Sets up a new game"""
+    def __init__(self, num_players=2, die=None, sink=CONSOLE, profiler=None, rules=RULES):
+        """Sets up a new game, rolling die if given or a new Die for the
+        rules otherwise.
+
+        Rolls, parts built and the win are reported to sink. If a Profiler
+        is given, the die, beetles and sink are wrapped to feed it"""
         self.__players = []
+        self.__profiler = profiler
+        if die is None:
+            die = Die(rules.num_sides)
+        if profiler is not None:
+            die = profiler.wrap_die(die)
+            sink = profiler.wrap_sink(sink)
         for i in range(num_players):
             playername = "Player " + str(i+1)
-            self.__players.append(Beetle(playername))
-        self.__die = Die()
+            player = Beetle(playername, sink=sink, rules=rules)
+            if profiler is not None:
+                player = profiler.wrap_beetle(player)
+            self.__players.append(player)
+        self.__die = die
+        self.__sink = sink
+        self.winner = None  # seat of the winning player once the game is over
 
     def turn(self):
         """Takes a turn for the current player."""
-        for player in self.__players:
+        sink = self.__sink
+        for seat, player in enumerate(self.__players):
             roll = self.__die.roll()
             player.turn(roll)
-            print(player.name, 'rolled a', roll)
+            if sink.enabled:
+                sink.roll(player.name, roll)
             if player.complete():
-                if __name__ == '__main__':
-                    if player.name is not None:
-                        print(player.name, "wins!")
-                    print("GAME OVER")
+                if sink.enabled:
+                    sink.win(player.name)
+                self.winner = seat
                 yield True  # yield returns a generator objectthat keeps track of its internal state
             yield False     # so we can call turn multiple times per round, once for each player
 
     def round(self):
         """Takes a turn for all players"""
-        for turn in self.turn():
+        turns = self.turn()
+        if self.__profiler is not None:
+            turns = self.__profiler.count_round(turns)
+        for turn in turns:
             if turn:
                 return True
         return False
 
 
-def cli_main():
+def cli_main(num_players=2, profiler=None, rules=RULES):
     """Main loop of program in basic CLI mode.
 
-    Runs the game until exit requested."""
+    Runs the game until exit requested. If a Profiler is given it reports
+    after every game."""
     # Ensure KeyboardInterrupt is fired on SIGINT
     signal.signal(signal.SIGINT, signal.default_int_handler)
 
     while True:
         try:
-            game = Game()
+            game = Game(num_players, profiler=profiler, rules=rules)
 
             while not game.round():
                 pass
+            if profiler is not None:
+                profiler.report()
 
             key = input("Press Enter to play again or q to exit. ")
             if key == 'q' or key == 'Q':
@@ -180,5 +202,128 @@ def game_exit():
     sys.exit(0)
 
 
+# One result row per game for each output format of batch mode
+ROW_FORMATS = {
+    'csv': '{},{},{},{}\n',
+    'jsonl': '{{"game": {}, "winner": {}, "rounds": {}, "rolls": {}}}\n',
+}
+CSV_HEADER = 'game,winner,rounds,rolls\n'
+
+
+def batch_main(num_games, num_players=2, seed=None, out_format='csv', out=None,
+               profiler=None, replay=None, rules=RULES):
+    """Plays num_games games back to back without prompting.
+
+    Writes one row per game to the file named out, or to stdout, through a
+    large buffer. Games are numbered from 0 and winners from 1. On Ctrl+C
+    the rows of all finished games are flushed before exiting. If a
+    Profiler is given it reports at the end, as well as however often it
+    was set up to. If replay names a file, every game is also recorded
+    there.
+
+    With a seed, or when recording, game n rolls beetle_rng.game_die(seed,
+    n), so the seed and number of any game replay it on their own, as
+    beetle.py --seed and beetle_replay.py --seed do. A recorded run without
+    a seed draws one. Otherwise the dice come from a faster DiceStream."""
+    if num_games < 0:
+        raise ValueError("number of games must not be negative")
+    if num_players < 1:
+        raise ValueError("a game needs at least one player")
+    if seed is not None and seed < 0:
+        raise ValueError("seed must not be negative")
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    row = ROW_FORMATS[out_format]
+    game_die = None
+    if seed is None and replay is not None:
+        seed = secrets.randbits(64)
+    if seed is not None:
+        from beetle_rng import game_die
+    else:
+        die = DiceStream(rules.num_sides)
+    stream = open(out, 'w', buffering=1 << 20) if out else \
+        open(sys.stdout.fileno(), 'w', buffering=1 << 20, closefd=False)
+    if replay is not None:
+        from beetle_replay import ReplayWriter
+        replay = ReplayWriter(replay)
+
+    played = 0
+    try:
+        write = stream.write
+        if out_format == 'csv':
+            write(CSV_HEADER)
+        for number in range(num_games):
+            sink = SILENT
+            if replay is not None:
+                sink = replay.start_game(num_players, seed, number)
+            if game_die is not None:
+                die = game_die(seed, number, rules.num_sides)
+            game = Game(num_players, die=die, sink=sink, profiler=profiler, rules=rules)
+            rounds = 1
+            while not game.round():
+                rounds += 1
+            rolls = (rounds - 1) * num_players + game.winner + 1
+            write(row.format(number, game.winner + 1, rounds, rolls))
+            played += 1
+    except KeyboardInterrupt:
+        # each row is written in one call, so what is buffered is whole rows
+        print('Interrupted after', played, 'games', file=sys.stderr)
+        sys.exit(130)
+    finally:
+        stream.close()
+        if replay is not None:
+            replay.close()
+        if profiler is not None:
+            profiler.report()
+
+
+def main():
+    """Runs interactive mode, or batch mode when a number of games is given"""
+    parser = argparse.ArgumentParser(description="The dice game Beetle")
+    parser.add_argument('--games', type=int, default=None,
+                        help="play this many games without prompting (batch mode)")
+    parser.add_argument('--players', type=int, default=2, help="players per game")
+    parser.add_argument('--seed', type=int, default=None, help="seed for the dice")
+    parser.add_argument('--format', choices=sorted(ROW_FORMATS), default='csv',
+                        help="batch mode output format")
+    parser.add_argument('--out', default=None, help="batch mode output file (default stdout)")
+    parser.add_argument('--profile', action='store_true',
+                        help="count rolls and time each phase, reporting to stderr")
+    parser.add_argument('--replay', default=None,
+                        help="batch mode: also record every game to this replay file")
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+    if args.players < 1:
+        parser.error("--players must be at least 1")
+    if args.games is not None and args.games < 0:
+        parser.error("--games must not be negative")
+    if args.replay is not None and rules is not RULES:
+        parser.error("replays record the standard rules only")
+    if args.seed is not None and args.seed < 0:
+        parser.error("--seed must not be negative")
+    if args.replay is not None:
+        from beetle_replay import MAX_PLAYERS, MAX_SEED
+        if args.seed is not None and args.seed > MAX_SEED:
+            parser.error("replays hold seeds up to {}".format(MAX_SEED))
+        if not 1 <= args.players <= MAX_PLAYERS:
+            parser.error("replays hold games of 1 to {} players".format(MAX_PLAYERS))
+
+    profiler = None
+    if args.profile:
+        from beetle_profile import Profiler
+        profiler = Profiler(report_interval=10.0, rules=rules)
+
+    if args.games is None:
+        cli_main(args.players, profiler, rules)
+    else:
+        batch_main(args.games, args.players, args.seed, args.format, args.out, profiler,
+                   args.replay, rules)
+
+
 if __name__ == "__main__":
-    cli_main()
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""One game of Beetle with a huge number of players
+
+Every player's board is a byte in a bytearray, and nobody is visited on a
+round they build nothing. The number of turns a player needs to build the
+next part is geometric, so instead of rolling for every turn, CrowdGame
+draws that waiting time once per part and files the player under the round
+the part gets built. Where the rules let a board build one of several
+parts, which one is drawn from the faces that build something. A round
+only touches the players filed under it, and the first of them, in seat
+order, to finish the last part wins, exactly as in Game.turn. Setting up
+costs a draw per player; after that the cost of a round follows the number
+of players who made progress.
+
+The game follows the same rules and the same distribution of outcomes as
+Game in beetle_cli.py, but does not roll the same dice, so a seed here
+doesn't replay a game played there."""
+
+import argparse
+from array import array
+import math
+import random
+import time
+
+from beetle_cli import RULES
+from beetle_rules import load_rules
+
+
+def progress_logs(rules=RULES) -> list:
+    """log(1 - chance of building a part in a turn) at each stage, None where
+    a part is built on every turn or, for the finished beetle, never"""
+    logs = []
+    for stage in range(rules.num_states):
+        chance = len(rules.moving_rolls(stage)) / rules.num_sides
+        logs.append(math.log(1 - chance) if 0 < chance < 1 else None)
+    return logs
+
+
+class CrowdGame:
+    """A game of any number of players, played a round at a time"""
+
+    def __init__(self, num_players, seed=None, rules=RULES):
+        self.num_players = num_players
+        # build stage of every seat
+        if rules.num_states <= 256:
+            self.stages = bytearray(num_players)
+        else:
+            self.stages = array('H', [0]) * num_players
+        self.rounds = 0
+        self.winner = None
+        self._rules = rules
+        self._random = random.Random(seed).random
+        self._logs = progress_logs(rules)
+        # stages each stage can move to, one for each face that builds a part
+        self._next = [[rules.transitions[stage][roll] for roll in rules.moving_rolls(stage)]
+                      for stage in range(rules.num_states)]
+        # round number: seats that build a part that round, in seat order
+        self._calendar = {}
+        for seat in range(num_players):
+            self._schedule(seat, 0)
+
+    def _schedule(self, seat, stage):
+        """Files seat under the round it builds the part after stage"""
+        log = self._logs[stage]
+        wait = 1 if log is None else 1 + int(math.log(1.0 - self._random()) / log)
+        due = self.rounds + wait
+        seats = self._calendar.get(due)
+        if seats is None:
+            seats = self._calendar[due] = array('l')
+        seats.append(seat)
+
+    def round(self) -> bool:
+        """Plays the next round, returning True once the game has been won"""
+        if self.winner is not None:
+            return True
+        self.rounds += 1
+        seats = self._calendar.pop(self.rounds, None)
+        if seats is None:
+            return False
+        stages = self.stages
+        complete = self._rules.complete_state
+        following = self._next
+        if self.rounds > 1:
+            # seats filed during earlier rounds are not in seat order
+            seats = sorted(seats)
+        for seat in seats:
+            choices = following[stages[seat]]
+            if len(choices) == 1:
+                stage = choices[0]
+            else:
+                stage = choices[int(self._random() * len(choices))]
+            stages[seat] = stage
+            if stage == complete:
+                # seats after the winner never get to roll this round
+                self.winner = seat
+                return True
+        for seat in seats:
+            self._schedule(seat, stages[seat])
+        return False
+
+    def play(self) -> int:
+        """Plays until someone wins, returning the winning seat"""
+        while not self.round():
+            pass
+        return self.winner
+
+    def progressed(self) -> int:
+        """Number of players with at least one part built"""
+        return self.num_players - self.stages.count(0)
+
+
+def main():
+    """Plays one game with as many players as asked and reports the winner"""
+    parser = argparse.ArgumentParser(description="Play one Beetle game with many players")
+    parser.add_argument('players', type=int, nargs='?', default=1000000)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    args = parser.parse_args()
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    start = time.perf_counter()
+    game = CrowdGame(args.players, args.seed, rules)
+    setup = time.perf_counter() - start
+    winner = game.play()
+    elapsed = time.perf_counter() - start
+    print('Player {} of {:,} wins after {} rounds'.format(winner + 1, args.players, game.rounds))
+    print('set up in {:.2f}s, played in {:.2f}s'.format(setup, elapsed - setup))
+
+
+if __name__ == "__main__":
+    main()
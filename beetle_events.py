@@ -0,0 +1,70 @@
+"""Event sinks for the dice game Beetle
+
+Beetle and Game report what happens in a game to an event sink instead of
+printing. There are three kinds of event: a roll, a part being built and a
+win. The base EventSink ignores them all and is disabled, so the game skips
+even building the event when nobody is listening."""
+
+import json
+import sys
+
+
+class EventSink:
+    """Sink that ignores every event. Subclasses set enabled to True"""
+
+    enabled = False
+
+    def roll(self, player, roll):
+        """player rolled roll"""
+
+    def part_built(self, player, roll, part):
+        """player rolled roll and built part"""
+
+    def win(self, player):
+        """player completed their beetle and won the game"""
+
+
+class ConsoleSink(EventSink):
+    """Human readable messages, as the game has always printed them"""
+
+    enabled = True
+
+    def __init__(self, out=None):
+        """Prints to out, or to stdout at the time of each event by default"""
+        self._out = out
+
+    def roll(self, player, roll):
+        print(player, 'rolled a', roll, file=self._out or sys.stdout)
+
+    def part_built(self, player, roll, part):
+        print(player, "rolled a {}, built {}".format(roll, part), file=self._out or sys.stdout)
+
+    def win(self, player):
+        out = self._out or sys.stdout
+        if player is not None and player != "":
+            print(player, "wins!", file=out)
+        print("GAME OVER", file=out)
+
+
+class JsonlSink(EventSink):
+    """One JSON object per line and per event, for other programs to read"""
+
+    enabled = True
+
+    def __init__(self, out):
+        """Writes to out, an open text file"""
+        self._write = out.write
+
+    def roll(self, player, roll):
+        self._write(json.dumps({'event': 'roll', 'player': player, 'roll': roll}) + '\n')
+
+    def part_built(self, player, roll, part):
+        self._write(json.dumps({'event': 'part_built', 'player': player,
+                                'roll': roll, 'part': part}) + '\n')
+
+    def win(self, player):
+        self._write(json.dumps({'event': 'win', 'player': player}) + '\n')
+
+
+SILENT = EventSink()
+CONSOLE = ConsoleSink()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""Load generator for the Beetle game server
+
+Simulated players arrive at a configurable rate, each opening a connection
+to a beetle_server endpoint and playing full hotseat games, pausing for a
+think time between rolls. Every reply is checked against a local Beetle
+playing the same rolls, and every request's latency goes into a
+histogram. Prints latency percentiles and requests per second over time.
+
+By default a server is started on localhost for the run, so everything
+stays on this machine."""
+
+import argparse
+import asyncio
+from collections import Counter
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+from beetle_cli import Beetle
+from beetle_events import SILENT
+from beetle_stats import QuantileSketch
+
+
+class ReplyError(Exception):
+    """The server replied with something the rules don't allow"""
+
+
+class LoadTest:
+    """Plays simulated players against one server and collects the results"""
+
+    def __init__(self, host, port, seats=2, games=1, think=0.0, seed=None):
+        self.host = host
+        self.port = port
+        self.seats = seats
+        self.games = games
+        self.think = think
+        self.rng = random.Random(seed)
+        self.latency = QuantileSketch()  # microseconds
+        self.per_second = Counter()  # requests completed in each second of the run
+        self.errors = Counter()
+        self.games_played = 0
+        self.start = None
+
+    async def _request(self, reader, writer, request) -> dict:
+        sent = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b'\n')
+        await writer.drain()
+        line = await reader.readline()
+        done = time.perf_counter()
+        if not line:
+            raise ConnectionError("server closed the connection")
+        self.latency.record((done - sent) * 1e6)
+        self.per_second[int(done - self.start)] += 1
+        return json.loads(line)
+
+    async def _play_game(self, reader, writer):
+        """Plays one game, checking every roll against the reference rules"""
+        reply = await self._request(reader, writer, {'op': 'new', 'players': self.seats,
+                                                     'hotseat': True})
+        if not reply.get('ok'):
+            raise ReplyError(reply.get('error'))
+        reference = [Beetle(sink=SILENT) for _ in range(self.seats)]
+        seat = 0
+        while True:
+            if self.think:
+                await asyncio.sleep(self.rng.expovariate(1 / self.think))
+            reply = await self._request(reader, writer, {'op': 'roll'})
+            if not reply.get('ok'):
+                raise ReplyError(reply.get('error'))
+            if reply['seat'] != seat:
+                raise ReplyError("rolled for seat {}, expected {}".format(reply['seat'], seat))
+            beetle = reference[seat]
+            built = beetle.turn(reply['roll'])
+            if built != reply['built'] or beetle.stage != reply['stage']:
+                raise ReplyError("roll {} at seat {} broke the rules".format(reply['roll'], seat))
+            winner = seat if beetle.complete() else None
+            if reply['winner'] != winner:
+                raise ReplyError("wrong winner {}".format(reply['winner']))
+            if winner is not None:
+                self.games_played += 1
+                return
+            seat = (seat + 1) % self.seats
+
+    async def player(self):
+        """One simulated player, playing its games on one connection"""
+        try:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        except OSError as err:
+            self.errors[type(err).__name__] += 1
+            return
+        try:
+            for _ in range(self.games):
+                await self._play_game(reader, writer)
+        except (ReplyError, ConnectionError, ValueError, KeyError) as err:
+            self.errors[type(err).__name__ + ': ' + str(err)] += 1
+        finally:
+            writer.close()
+
+    async def run(self, num_players, rate=0.0):
+        """Starts num_players players, rate per second on average (all at
+        once if rate is 0), and waits for all of them to finish"""
+        self.start = time.perf_counter()
+        players = []
+        for _ in range(num_players):
+            players.append(asyncio.ensure_future(self.player()))
+            if rate:
+                await asyncio.sleep(self.rng.expovariate(rate))
+        await asyncio.gather(*players)
+        return time.perf_counter() - self.start
+
+    def report(self, elapsed, out=None):
+        """Prints latency percentiles, throughput and errors"""
+        out = out or sys.stdout
+        print('{} requests, {} games in {:.2f}s, {:.0f} requests/s'.format(
+            self.latency.total, self.games_played, elapsed, self.latency.total / elapsed), file=out)
+        for percent in (50, 90, 99, 99.9, 100):
+            print('  p{:<5} {:>10.3f} ms'.format(percent, self.latency.percentile(percent) / 1000),
+                  file=out)
+        print('requests per second over time:', file=out)
+        for second in sorted(self.per_second):
+            print('  {:>4}s {:>8}'.format(second, self.per_second[second]), file=out)
+        for error, count in self.errors.items():
+            print('ERROR', count, 'x', error, file=out)
+
+    def summary(self, elapsed) -> dict:
+        """Results in a form that can be saved as JSON"""
+        return {
+            'requests': self.latency.total,
+            'games': self.games_played,
+            'elapsed': elapsed,
+            'percentiles_us': {str(p): self.latency.percentile(p) for p in (50, 90, 99, 99.9, 100)},
+            'per_second': [self.per_second[s] for s in range(max(self.per_second, default=-1) + 1)],
+            'errors': dict(self.errors),
+        }
+
+
+def start_server(seed=0):
+    """Starts beetle_server.py on a free localhost port, returning (process, port)"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'beetle_server.py')
+    process = subprocess.Popen([sys.executable, script, '--port', '0',
+                                '--seed', str(seed)],
+                               stdout=subprocess.PIPE, text=True)
+    first_line = process.stdout.readline()  # Serving Beetle on host:port
+    return process, int(first_line.rsplit(':', 1)[1])
+
+
+def main():
+    """Runs a load test described on the command line"""
+    parser = argparse.ArgumentParser(description="Load test a Beetle server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=None,
+                        help="server to test (default: start one on localhost)")
+    parser.add_argument('--players', type=int, default=100, help="simulated players")
+    parser.add_argument('--seats', type=int, default=2, help="seats per table")
+    parser.add_argument('--games', type=int, default=1, help="games per player")
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help="players arriving per second (default all at once)")
+    parser.add_argument('--think', type=float, default=0.0,
+                        help="mean seconds a player waits between rolls")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--json', default=None, help="also write results to this file")
+    args = parser.parse_args()
+
+    server = None
+    port = args.port
+    if port is None:
+        server, port = start_server()
+    try:
+        test = LoadTest(args.host, port, args.seats, args.games, args.think, args.seed)
+        elapsed = asyncio.run(test.run(args.players, args.rate))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+    test.report(elapsed)
+    if args.json:
+        with open(args.json, 'w') as out:
+            json.dump(test.summary(elapsed), out, indent=2)
+    sys.exit(1 if test.errors else 0)
+
+
+if __name__ == "__main__":
+    main()
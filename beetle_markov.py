@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""Exact outcome statistics for the dice game Beetle
+
+A player's board is an absorbing Markov chain over build stages, with the
+finished beetle as the absorbing stage. The chain is built from the same
+transition table Beetle.turn uses, for the standard rules or any variant,
+so no games have to be played to know how long a game lasts or how likely
+each seat is to win."""
+
+from fractions import Fraction
+import sys
+
+from beetle_cli import RULES
+from beetle_rules import load_rules
+
+
+def transition_matrix(rules=RULES, exact=False):
+    """Returns matrix[stage][next_stage], the chance of moving from stage to
+    next_stage in one turn with the fair die of rules"""
+    num_sides = rules.num_sides
+    step = Fraction(1, num_sides) if exact else 1.0 / num_sides
+    matrix = [[step * 0] * rules.num_states for _ in rules.transitions]
+    for stage, row in enumerate(rules.transitions):
+        for roll in range(1, num_sides + 1):
+            matrix[stage][row[roll]] += step
+    return matrix
+
+
+def turns_to_finish(rules=RULES, exact=False, tolerance=1e-15, max_turns=None):
+    """Distribution of the number of turns one player needs to finish
+
+    Returns a list where index t is the chance of finishing on turn t.
+    With floats the list stops once less than tolerance of the probability
+    is left. Fractions never run out, so exact needs max_turns."""
+    if exact and max_turns is None:
+        raise ValueError("exact distribution needs max_turns")
+    matrix = transition_matrix(rules, exact)
+    zero = Fraction(0) if exact else 0.0
+    complete = rules.complete_state  # the last stage, since it has every part
+
+    # Chance of being at each stage, starting with no parts built
+    state = [zero] * len(matrix)
+    state[0] = zero + 1
+    distribution = [zero]
+    turn = 0
+    while max_turns is None or turn < max_turns:
+        turn += 1
+        new_state = [zero] * len(matrix)
+        for stage, chance in enumerate(state):
+            if not chance:
+                continue
+            for next_stage, step in enumerate(matrix[stage]):
+                if step:
+                    new_state[next_stage] += chance * step
+        distribution.append(new_state[complete] - state[complete])
+        state = new_state
+        if not exact and sum(state[:complete]) < tolerance:
+            break
+    return distribution
+
+
+def expected_turns(rules=RULES, exact=False):
+    """Mean number of turns one player needs to finish
+
+    Solved backwards from the finished stage, since a board never loses
+    parts and so only moves to higher numbered stages:
+    E[s] = (1 + sum of P(s, n) * E[n] for n != s) / (1 - P(s, s))"""
+    matrix = transition_matrix(rules, exact)
+    expected = [Fraction(0) if exact else 0.0] * len(matrix)
+    for stage in reversed(range(rules.complete_state)):
+        row = matrix[stage]
+        moving = sum(row[n] * expected[n] for n in range(len(row)) if n != stage)
+        expected[stage] = (1 + moving) / (1 - row[stage])
+    return expected[0]
+
+
+def _survival(distribution):
+    """survival[t] is the chance a player has not finished after t turns"""
+    survival = []
+    left = 1.0
+    for chance in distribution:
+        left -= chance
+        survival.append(left)
+    return survival
+
+
+def win_probabilities(num_players=2, rules=RULES, tolerance=1e-15):
+    """Chance of each seat winning, in the seat order Game.turn plays in
+
+    Seat i wins on round t when it finishes on its t-th turn, every earlier
+    seat is still unfinished after t turns and every later seat is still
+    unfinished after t - 1 turns, since they haven't rolled yet that round."""
+    distribution = turns_to_finish(rules, tolerance=tolerance)
+    survival = _survival(distribution)
+    wins = []
+    for seat in range(num_players):
+        wins.append(sum(distribution[t] * survival[t] ** seat
+                        * survival[t - 1] ** (num_players - 1 - seat)
+                        for t in range(1, len(distribution))))
+    return wins
+
+
+def game_length(num_players=2, rules=RULES, tolerance=1e-15):
+    """Distribution of the number of rounds a game lasts
+
+    Returns a list where index t is the chance the game is won in round t."""
+    survival = _survival(turns_to_finish(rules, tolerance=tolerance))
+    return [0.0] + [survival[t - 1] ** num_players - survival[t] ** num_players
+                    for t in range(1, len(survival))]
+
+
+def main():
+    """Prints exact statistics for the number of players given on the command line
+
+    Usage: beetle_markov.py [players] [rules]"""
+    num_players = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    rules = load_rules(sys.argv[2]) if len(sys.argv) > 2 else RULES
+    lengths = game_length(num_players, rules)
+    print('expected turns to finish', expected_turns(rules))
+    print('expected rounds per game', sum(t * p for t, p in enumerate(lengths)))
+    for seat, chance in enumerate(win_probabilities(num_players, rules)):
+        print('Player', seat + 1, 'wins', chance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""Opt-in instrumentation for the dice game Beetle
+
+A Profiler handed to Game wraps its die, beetles and event sink, and counts
+what happens in every round: rolls, productive and wasted rolls for each
+build stage, time spent in each phase and how often the Game.turn generator
+is resumed. Games without a profiler only pay for a check of None once per
+round and at set up."""
+
+import sys
+import time
+
+from beetle_cli import RULES, Die
+from beetle_events import EventSink
+
+# Phases timed by the profiler. Generator and loop overhead is whatever
+# remains of a round after the other three.
+PHASES = ('roll', 'turn', 'output', 'round')
+
+
+class Profiler:
+    """Counters for one or more games, with a snapshot and a periodic report"""
+
+    def __init__(self, report_interval=None, out=None, rules=RULES):
+        """Reports to out (default stderr) every report_interval seconds of
+        play, or only when asked if report_interval is None. Build stages
+        are counted for games played by rules"""
+        self._report_interval = report_interval
+        self._out = out
+        self._stages = rules.num_states - 1  # every stage but the finished beetle
+        self.reset()
+
+    def reset(self):
+        """Sets every counter back to zero"""
+        self.rolls = 0
+        self.rounds = 0
+        self.resumptions = 0
+        self.productive = [0] * self._stages  # rolls that built a part, by stage
+        self.wasted = [0] * self._stages  # rolls that built nothing, by stage
+        self.phase_time = dict.fromkeys(PHASES, 0.0)
+        self._last_report = time.perf_counter()
+
+    def wrap_die(self, die=None):
+        """Die that counts and times its rolls, wrapping die or a new Die"""
+        return _ProfiledDie(die if die is not None else Die(), self)
+
+    def wrap_beetle(self, beetle):
+        """Beetle that counts productive and wasted rolls by build stage"""
+        return _ProfiledBeetle(beetle, self)
+
+    def wrap_sink(self, sink):
+        """Event sink that times the output of sink"""
+        return _ProfiledSink(sink, self) if sink.enabled else sink
+
+    def count_round(self, turns):
+        """Passes through the turns generator of a round, counting resumptions
+
+        The round is counted and timed when it ends, including a winning
+        round that Game.round stops reading after the winner's turn."""
+        start = time.perf_counter()
+        try:
+            for turn in turns:
+                self.resumptions += 1
+                yield turn
+        finally:
+            self.rounds += 1
+            now = time.perf_counter()
+            self.phase_time['round'] += now - start
+            if self._report_interval is not None and \
+                    now - self._last_report >= self._report_interval:
+                self.report()
+
+    def snapshot(self) -> dict:
+        """Copy of every counter, safe to keep while play goes on"""
+        phase_time = dict(self.phase_time)
+        phase_time['other'] = phase_time['round'] - sum(
+            phase_time[phase] for phase in PHASES if phase != 'round')
+        return {
+            'rolls': self.rolls,
+            'rounds': self.rounds,
+            'resumptions': self.resumptions,
+            'resumptions_per_round': self.resumptions / self.rounds if self.rounds else 0.0,
+            'productive': list(self.productive),
+            'wasted': list(self.wasted),
+            'phase_time': phase_time,
+        }
+
+    def report(self):
+        """Prints a snapshot in human readable form"""
+        out = self._out or sys.stderr
+        snap = self.snapshot()
+        print('rolls {rolls}, rounds {rounds}, resumptions per round '
+              '{resumptions_per_round:.2f}'.format(**snap), file=out)
+        for stage in range(self._stages):
+            print('  stage {}: {} productive, {} wasted'.format(
+                stage, snap['productive'][stage], snap['wasted'][stage]), file=out)
+        print('  time ' + ', '.join('{} {:.3f}s'.format(phase, seconds)
+                                    for phase, seconds in snap['phase_time'].items()),
+              file=out)
+        self._last_report = time.perf_counter()
+
+
+class _ProfiledDie:
+    """Die wrapper for Profiler.wrap_die"""
+
+    def __init__(self, die, profiler):
+        self._roll = die.roll
+        self._profiler = profiler
+
+    def roll(self) -> int:
+        start = time.perf_counter()
+        roll = self._roll()
+        self._profiler.phase_time['roll'] += time.perf_counter() - start
+        self._profiler.rolls += 1
+        return roll
+
+
+class _ProfiledBeetle:
+    """Beetle wrapper for Profiler.wrap_beetle, otherwise the same beetle"""
+
+    def __init__(self, beetle, profiler):
+        self._beetle = beetle
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._beetle, name)
+
+    def __str__(self) -> str:
+        return str(self._beetle)
+
+    def turn(self, roll) -> bool:
+        stage = self._beetle.stage
+        phase_time = self._profiler.phase_time
+        output = phase_time['output']
+        start = time.perf_counter()
+        built = self._beetle.turn(roll)
+        # output of a part being built is already counted by the sink
+        phase_time['turn'] += time.perf_counter() - start - (phase_time['output'] - output)
+        if built:
+            self._profiler.productive[stage] += 1
+        else:
+            self._profiler.wasted[stage] += 1
+        return built
+
+
+class _ProfiledSink(EventSink):
+    """Event sink wrapper for Profiler.wrap_sink"""
+
+    enabled = True
+
+    def __init__(self, sink, profiler):
+        self._sink = sink
+        self._profiler = profiler
+
+    def roll(self, player, roll):
+        start = time.perf_counter()
+        self._sink.roll(player, roll)
+        self._profiler.phase_time['output'] += time.perf_counter() - start
+
+    def part_built(self, player, roll, part):
+        start = time.perf_counter()
+        self._sink.part_built(player, roll, part)
+        self._profiler.phase_time['output'] += time.perf_counter() - start
+
+    def win(self, player):
+        start = time.perf_counter()
+        self._sink.win(player)
+        self._profiler.phase_time['output'] += time.perf_counter() - start
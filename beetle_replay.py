@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""Compact binary replays of Beetle games
+
+A replay file starts with a file header, followed by any number of games:
+
+    file header   magic b'BTLR', format version (u16), rules version (u16)
+    game header   seed (u64), game number (u64), players (u8), rolls (u32)
+    rolls         one byte per roll, in the order they were rolled
+
+All numbers are little endian. Seats roll in turn, so roll i of a game was
+rolled by seat i % players, and the last roll is the winner's. Everything
+else about a game follows from its rolls and the rules, so a game takes
+about 60 to 100 bytes.
+
+ReplayWriter is an event sink, so recording a game is just passing it to
+Game. ReplayReader memory-maps a file and hands out each game's rolls as a
+memoryview into the map, without reading the file into memory.
+
+ReplayCursor seeks to any turn of a game. It keeps the boards every
+CHECKPOINT_INTERVAL turns, a byte per seat, so a seek only replays the
+rolls since the checkpoint before it."""
+
+import argparse
+import mmap
+import struct
+
+from beetle_cli import COMPLETE, RULES_VERSION, TRANSITIONS, Game
+from beetle_events import EventSink
+
+MAGIC = b'BTLR'
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH')
+GAME_HEADER = struct.Struct('<QQBI')
+CHECKPOINT_INTERVAL = 64  # turns between stored boards
+MAX_SEED = (1 << 64) - 1  # largest seed a game header holds
+MAX_PLAYERS = 255  # most players a game header holds
+
+
+class ReplayError(Exception):
+    """A replay file that can't be read"""
+
+
+class ReplayWriter(EventSink):
+    """Records games to a replay file
+
+    Call start_game before each game and pass the writer to Game as its
+    sink. A game is written out in one piece once it is won."""
+
+    enabled = True
+
+    def __init__(self, path):
+        self._file = open(path, 'wb', buffering=1 << 20)
+        self._file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, RULES_VERSION))
+        self._header = None
+        self._rolls = bytearray()
+        self.games = 0
+
+    def start_game(self, num_players, seed=0, game=None):
+        """Starts recording a new game, returning the writer to use as sink
+
+        seed and game identify where the game's dice came from, for
+        example the run's seed and the game's number within the run"""
+        self._header = (seed, self.games if game is None else game, num_players)
+        self._rolls = bytearray()
+        return self
+
+    def roll(self, player, roll):
+        self._rolls.append(roll)
+
+    def win(self, player):
+        """Writes the finished game out"""
+        seed, game, num_players = self._header
+        self._file.write(GAME_HEADER.pack(seed, game, num_players, len(self._rolls)))
+        self._file.write(self._rolls)
+        self._header = None
+        self.games += 1
+
+    def close(self):
+        """Closes the file. A game that was not won is not written"""
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class ReplayGame:
+    """One recorded game. rolls is a memoryview into the replay file"""
+
+    __slots__ = ('seed', 'game', 'num_players', 'rolls')
+
+    def __init__(self, seed, game, num_players, rolls):
+        self.seed = seed
+        self.game = game
+        self.num_players = num_players
+        self.rolls = rolls
+
+    @property
+    def winner(self) -> int:
+        """Seat of the winner, who made the last roll"""
+        return (len(self.rolls) - 1) % self.num_players
+
+    @property
+    def rounds(self) -> int:
+        """Number of rounds the game lasted"""
+        return (len(self.rolls) - 1) // self.num_players + 1
+
+    def stages(self, turn=None) -> list:
+        """Build stage of every seat after the first turn rolls (default all)"""
+        stages = [0] * self.num_players
+        num_players = self.num_players
+        for i, roll in enumerate(self.rolls[:turn]):
+            seat = i % num_players
+            stages[seat] = TRANSITIONS[stages[seat]][roll]
+        return stages
+
+    def check(self) -> bool:
+        """True if the rolls make a legal game: the last roll, and only the
+        last, completes a beetle"""
+        stages = self.stages()
+        return stages[self.winner] == COMPLETE and \
+            stages.count(COMPLETE) == 1 and \
+            self.stages(len(self.rolls) - 1)[self.winner] != COMPLETE
+
+
+class ReplayReader:
+    """Reads a replay file through a memory map"""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            self._file.close()
+            raise ReplayError("{} is empty".format(path))
+        if len(self._map) < FILE_HEADER.size:
+            self.close()
+            raise ReplayError("{} is not a Beetle replay".format(path))
+        magic, self.format_version, self.rules_version = \
+            FILE_HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ReplayError("{} is not a Beetle replay".format(path))
+        if self.format_version != FORMAT_VERSION:
+            self.close()
+            raise ReplayError("unknown replay format {}".format(self.format_version))
+        if self.rules_version != RULES_VERSION:
+            self.close()
+            raise ReplayError("{} was recorded with rules version {}, not {}".format(
+                path, self.rules_version, RULES_VERSION))
+        self._path = path
+
+    def __iter__(self):
+        """Yields every game in the file, in the order they were written
+
+        Raises ReplayError on reaching a game that was cut short"""
+        view = memoryview(self._map)
+        offset = FILE_HEADER.size
+        end = len(self._map)
+        unpack_from = GAME_HEADER.unpack_from
+        header_size = GAME_HEADER.size
+        while offset < end:
+            if offset + header_size > end:
+                raise ReplayError("{} ends inside a game header".format(self._path))
+            seed, game, num_players, num_rolls = unpack_from(view, offset)
+            offset += header_size
+            if offset + num_rolls > end:
+                raise ReplayError("{} ends after {} of the {} rolls of game {}".format(
+                    self._path, end - offset, num_rolls, game))
+            yield ReplayGame(seed, game, num_players, view[offset:offset + num_rolls])
+            offset += num_rolls
+
+    def close(self):
+        """Closes the file. The map stays until no game read from it is left"""
+        try:
+            self._map.close()
+        except BufferError:  # games still point into the map
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class _RollLog(EventSink):
+    """Sink that keeps the rolls of one game"""
+
+    enabled = True
+
+    def __init__(self):
+        self.rolls = bytearray()
+
+    def roll(self, player, roll):
+        self.rolls.append(roll)
+
+
+class ReplayCursor:
+    """Seeks to any turn of one recorded game in O(interval)"""
+
+    def __init__(self, num_players, rolls, interval=CHECKPOINT_INTERVAL):
+        """rolls holds every roll of the game, in order"""
+        self.num_players = num_players
+        self.rolls = rolls
+        self._interval = interval
+        # checkpoints[i] holds the stages after i * interval turns
+        self._checkpoints = []
+        stages = bytearray(num_players)
+        for turn, roll in enumerate(rolls):
+            if turn % interval == 0:
+                self._checkpoints.append(bytes(stages))
+            seat = turn % num_players
+            stages[seat] = TRANSITIONS[stages[seat]][roll]
+        if len(rolls) % interval == 0:
+            self._checkpoints.append(bytes(stages))
+
+    @classmethod
+    def from_game(cls, game, interval=CHECKPOINT_INTERVAL):
+        """Cursor over a ReplayGame read from a file"""
+        return cls(game.num_players, game.rolls, interval)
+
+    @classmethod
+    def from_seed(cls, seed, game, num_players=2, interval=CHECKPOINT_INTERVAL):
+        """Cursor over game number game of the campaign played with seed,
+        rebuilt by playing it again with beetle_rng.game_die"""
+        from beetle_rng import game_die
+        log = _RollLog()
+        replayed = Game(num_players, die=game_die(seed, game), sink=log)
+        while not replayed.round():
+            pass
+        return cls(num_players, bytes(log.rolls), interval)
+
+    def __len__(self) -> int:
+        """Number of turns in the game"""
+        return len(self.rolls)
+
+    def seek(self, turn) -> list:
+        """Build stage of every seat after the first turn turns"""
+        turn = max(0, min(turn, len(self.rolls)))
+        checkpoint = turn // self._interval
+        stages = bytearray(self._checkpoints[checkpoint])
+        num_players = self.num_players
+        for i in range(checkpoint * self._interval, turn):
+            seat = i % num_players
+            stages[seat] = TRANSITIONS[stages[seat]][self.rolls[i]]
+        return list(stages)
+
+    def turn_info(self, turn):
+        """(seat, roll) of turn number turn, counting from 1"""
+        return (turn - 1) % self.num_players, self.rolls[turn - 1]
+
+
+def scrub(cursor):
+    """Steps through a replay on the console
+
+    Enter shows the next turn, a number jumps to that turn, q quits."""
+    turn = 0
+    while True:
+        stages = cursor.seek(turn)
+        if turn:
+            seat, roll = cursor.turn_info(turn)
+            print('Turn {}: Player {} rolled a {}'.format(turn, seat + 1, roll))
+        for seat, stage in enumerate(stages):
+            print('  Player {} is {}% complete'.format(seat + 1, stage * 100 / COMPLETE))
+        if turn == len(cursor):
+            print('Player', cursor.turn_info(turn)[0] + 1, 'wins!')
+        key = input("Turn [Enter for next, number to jump, q to quit] ").strip()
+        if key in ('q', 'Q'):
+            return
+        if not key:
+            turn = min(turn + 1, len(cursor))
+            continue
+        try:
+            turn = max(0, min(int(key), len(cursor)))
+        except ValueError:
+            print('Not a turn number:', key)
+
+
+def main():
+    """Lists the games in a replay file, or scrubs through one of them"""
+    parser = argparse.ArgumentParser(description="Read Beetle replays")
+    parser.add_argument('file', nargs='?', help="replay file")
+    parser.add_argument('--game', type=int, default=None,
+                        help="scrub through the game with this game number")
+    parser.add_argument('--seed', type=int, default=None,
+                        help="instead of a file, replay game GAME of the campaign with this seed")
+    parser.add_argument('--players', type=int, default=2, help="players, with --seed")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        scrub(ReplayCursor.from_seed(args.seed, args.game or 0, args.players))
+        return
+    with ReplayReader(args.file) as reader:
+        if args.game is None:
+            print('rules version', reader.rules_version)
+            for game in reader:
+                print('game {} (seed {}): {} players, Player {} won in {} rounds'.format(
+                    game.game, game.seed, game.num_players, game.winner + 1, game.rounds))
+            return
+        for game in reader:
+            if game.game == args.game:
+                scrub(ReplayCursor(game.num_players, bytes(game.rolls)))
+                return
+        print('No game', args.game, 'in', args.file)
+
+
+if __name__ == "__main__":
+    main()
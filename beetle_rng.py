@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""Counter-based random numbers for reproducible Beetle campaigns
+
+CounterRandom is a drop in Random whose n-th number in stream s is a keyed
+hash of (s, n), in the style of counter-based generators like Philox.
+Give every game of a campaign its own stream and any single game can be
+played again on its own, without replaying the games before it."""
+
+from hashlib import blake2b
+from random import Random
+import struct
+import sys
+
+from beetle_cli import Die, Game
+
+_WORDS = 8  # 64 bit numbers in one 512 bit BLAKE2b digest
+_BLOCK = struct.Struct('<{}Q'.format(_WORDS))
+_COUNTER = struct.Struct('<QQ')
+
+
+class CounterRandom(Random):
+    """Random number generator that can jump to any position in O(1)
+
+    Streams with different numbers never share values, so workers, games or
+    players each given their own stream are independent. Every call to
+    random, getrandbits (up to 64 bits) or randint uses exactly one position,
+    so position n is always the n-th roll of a Die using this generator."""
+
+    def __init__(self, seed=0, stream=0):
+        """Starts stream number stream of seed at position 0"""
+        self.__stream = stream
+        Random.__init__(self, seed)
+
+    def seed(self, a=0, version=2):
+        """Keys the generator with a and goes back to position 0"""
+        self.__seed = a
+        self.__key = blake2b(repr(a).encode()).digest()
+        self.__position = 0
+        self.__block_index = None
+        self.__block = None
+
+    def spawn(self, stream):
+        """New generator for another stream of the same seed"""
+        return CounterRandom(self.__seed, stream)
+
+    def seek(self, position):
+        """Jumps to position, the number of values used so far"""
+        self.__position = position
+
+    def tell(self) -> int:
+        """Number of values used so far"""
+        return self.__position
+
+    def next64(self) -> int:
+        """Next 64 bit number in the stream"""
+        block_index, offset = divmod(self.__position, _WORDS)
+        if block_index != self.__block_index:
+            digest = blake2b(_COUNTER.pack(self.__stream, block_index), key=self.__key).digest()
+            self.__block = _BLOCK.unpack(digest)
+            self.__block_index = block_index
+        self.__position += 1
+        return self.__block[offset]
+
+    def random(self) -> float:
+        """Float in [0, 1) from the top 53 bits of the next number"""
+        return (self.next64() >> 11) * (1.0 / 9007199254740992)
+
+    def getrandbits(self, k) -> int:
+        """k random bits, one position for every 64 bits"""
+        if k <= 64:
+            return self.next64() >> (64 - k) if k else 0
+        bits = 0
+        for shift in range(0, k, 64):
+            bits |= self.next64() << shift
+        return bits & ((1 << k) - 1)
+
+    def randint(self, a, b) -> int:
+        """Integer in [a, b], using a single position
+
+        Scales the next number into the range instead of rejecting values,
+        so the result depends only on the position. The bias is below one
+        in 2**58 for any die."""
+        return a + ((self.next64() * (b - a + 1)) >> 64)
+
+    def getstate(self):
+        """Seed, stream and position, enough to carry on from here"""
+        return (self.__seed, self.__stream, self.__position)
+
+    def setstate(self, state):
+        """Restores a state returned by getstate"""
+        seed, self.__stream, position = state
+        self.seed(seed)
+        self.__position = position
+
+
+def game_die(seed, game, num_sides=6) -> Die:
+    """Die for game number game of the campaign played with seed"""
+    return Die(num_sides, rng=CounterRandom(seed, stream=game))
+
+
+def main():
+    """Plays one game of a campaign again, printing every roll
+
+    Usage: beetle_rng.py seed game [players]"""
+    seed = int(sys.argv[1])
+    game_number = int(sys.argv[2])
+    num_players = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    game = Game(num_players, die=game_die(seed, game_number))
+    while not game.round():
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+"""Rules of the dice game Beetle, and house variants of them
+
+A set of rules is a die and a list of parts, each with the roll that
+builds it and the parts that must be built before it. Rules compiles that
+once into dense tables, so every engine plays any variant with the same
+table lookups it uses for the standard game:
+
+    transitions[state][roll]   state after rolling roll at state
+    complete[state]            True for the finished beetle
+    new_part[state][roll]      index of the part that roll builds, or None
+
+A state is the set of parts built so far. States are numbered by how many
+parts they hold, so the empty board is 0, the finished beetle is the
+highest state and a roll never moves to a lower state. When every part
+needs the one before it, as in the standard rules, state n is simply the
+first n parts.
+
+A part that several parts unlock can be built in any order with them. If a
+roll could build more than one part, the one listed first is built.
+
+Variants are given as Python objects or as JSON files:
+
+    {"name": "free", "sides": 6,
+     "parts": [["body", 1], ["head", 2], ["left legs", 3, ["head"]], ...]}
+
+A part without a list of parts to follow comes after the part listed
+before it, and a single name may stand in for a list of one."""
+
+import hashlib
+import json
+import os
+
+# The standard parts, in the order they are built, with the roll each needs
+PARTS = (('body', 1), ('head', 2),
+         ('left legs', 3), ('right legs', 3),
+         ('left antenna', 4), ('right antenna', 4),
+         ('left eye', 5), ('right eye', 5))
+
+
+class RulesError(ValueError):
+    """Rules that can't be played"""
+
+
+class Rules:
+    """A rules definition compiled to transition tables"""
+
+    def __init__(self, parts, num_sides=6, name='custom'):
+        """parts holds (name, roll) or (name, roll, after) for every part,
+        where after names the parts that must be built first"""
+        self.name = name
+        self.num_sides = num_sides
+        self.parts = self._normalize(parts, num_sides)
+        self._fingerprint = None
+        self._compile()
+
+    @staticmethod
+    def _normalize(parts, num_sides) -> tuple:
+        """(name, roll, after) for every part, with after filled in"""
+        if isinstance(num_sides, bool) or not isinstance(num_sides, int) or num_sides < 1:
+            raise RulesError("the die needs a whole number of sides, not {!r}".format(num_sides))
+        if not isinstance(parts, (list, tuple)):
+            raise RulesError("parts must be a list, not {!r}".format(parts))
+        normalized = []
+        for part in parts:
+            if not isinstance(part, (list, tuple)) or len(part) not in (2, 3):
+                raise RulesError("a part is [name, roll] or [name, roll, after], not {!r}".format(
+                    part))
+            name, roll = part[0], part[1]
+            if not isinstance(name, str):
+                raise RulesError("part names must be strings, not {!r}".format(name))
+            if isinstance(roll, bool) or not isinstance(roll, int):
+                raise RulesError("{} needs a whole number roll, not {!r}".format(name, roll))
+            if len(part) > 2:
+                after = (part[2],) if isinstance(part[2], str) else part[2]
+                if not isinstance(after, (list, tuple)) or \
+                        not all(isinstance(needed, str) for needed in after):
+                    raise RulesError("{} must follow a list of part names, not {!r}".format(
+                        name, part[2]))
+                after = tuple(after)
+            else:
+                after = (normalized[-1][0],) if normalized else ()
+            if not 1 <= roll <= num_sides:
+                raise RulesError("{} needs a {}, which a {} sided die can't roll".format(
+                    name, roll, num_sides))
+            normalized.append((name, roll, after))
+        names = [name for name, _, _ in normalized]
+        if len(set(names)) != len(names):
+            raise RulesError("part names must be different")
+        for name, _, after in normalized:
+            for needed in after:
+                if needed not in names:
+                    raise RulesError("{} follows {}, which is not a part".format(name, needed))
+        return tuple(normalized)
+
+    def _compile(self):
+        index = {name: i for i, (name, _, _) in enumerate(self.parts)}
+        needs = [sum(1 << index[needed] for needed in after) for _, _, after in self.parts]
+        by_roll = [[(i, needs[i]) for i, (_, roll, _) in enumerate(self.parts) if roll == face]
+                   for face in range(self.num_sides + 1)]
+
+        def build(mask, roll):
+            for i, need in by_roll[roll]:
+                if not mask >> i & 1 and mask & need == need:
+                    return mask | 1 << i, i
+            return mask, None
+
+        # every set of parts that can be reached from the empty board
+        reached = {0}
+        pending = [0]
+        while pending:
+            mask = pending.pop()
+            for roll in range(1, self.num_sides + 1):
+                after, _ = build(mask, roll)
+                if after not in reached:
+                    reached.add(after)
+                    pending.append(after)
+        full = (1 << len(self.parts)) - 1
+        if full not in reached:
+            raise RulesError("a complete beetle can't be built with these rules")
+
+        masks = sorted(reached, key=lambda mask: (bin(mask).count('1'), mask))
+        state_of = {mask: state for state, mask in enumerate(masks)}
+        self.built = tuple(masks)  # bit i set where part i is built
+        self.num_built = tuple(bin(mask).count('1') for mask in masks)
+        self.transitions = tuple(
+            tuple(state_of[build(mask, roll)[0]] if roll else state_of[mask]
+                  for roll in range(self.num_sides + 1))
+            for mask in masks)
+        self.new_part = tuple(
+            tuple(build(mask, roll)[1] if roll else None for roll in range(self.num_sides + 1))
+            for mask in masks)
+        self.complete = tuple(mask == full for mask in masks)
+        self.complete_state = state_of[full]
+        self.num_states = len(masks)
+        # True when each state leads on to at most one other, as in a chain
+        self.chain = all(len({row[roll] for roll in range(1, self.num_sides + 1)} - {state}) <= 1
+                         for state, row in enumerate(self.transitions))
+
+    @property
+    def num_parts(self) -> int:
+        return len(self.parts)
+
+    def part_name(self, state, roll):
+        """Name of the part roll builds at state, None if it builds nothing"""
+        part = self.new_part[state][roll]
+        return None if part is None else self.parts[part][0]
+
+    def moving_rolls(self, state) -> list:
+        """Rolls that build a part at state"""
+        return [roll for roll in range(1, self.num_sides + 1)
+                if self.transitions[state][roll] != state]
+
+    def to_dict(self) -> dict:
+        return {'name': self.name, 'sides': self.num_sides,
+                'parts': [[name, roll, list(after)] for name, roll, after in self.parts]}
+
+    @classmethod
+    def from_dict(cls, definition):
+        """Rules from a definition like to_dict's, raising RulesError if it
+        is malformed"""
+        if not isinstance(definition, dict) or 'parts' not in definition:
+            raise RulesError("a rules definition is an object with a list of parts")
+        name = definition.get('name', 'custom')
+        if not isinstance(name, str):
+            raise RulesError("the rules name must be a string, not {!r}".format(name))
+        return cls(definition['parts'], definition.get('sides', 6), name)
+
+    @property
+    def fingerprint(self) -> str:
+        """Hash of everything that affects play, the same for equal rules"""
+        if self._fingerprint is None:
+            definition = self.to_dict()
+            del definition['name']
+            text = json.dumps(definition, sort_keys=True, separators=(',', ':'))
+            self._fingerprint = hashlib.sha256(text.encode()).hexdigest()[:16]
+        return self._fingerprint
+
+    def __repr__(self):
+        return 'Rules({!r}, {} parts, {} sided die, {} states)'.format(
+            self.name, len(self.parts), self.num_sides, self.num_states)
+
+
+STANDARD = Rules(PARTS, 6, 'standard')
+
+# House variants that can be asked for by name
+VARIANTS = {
+    'standard': STANDARD,
+    # once the head is on, legs, antennae and eyes go on in any order
+    'free': Rules([('body', 1), ('head', 2)] +
+                  [(name, roll, ('head',)) for name, roll in PARTS[2:]], 6, 'free'),
+    # an eight sided die and two more parts after the eyes
+    'd8': Rules(PARTS + (('tail', 6), ('wings', 7)), 8, 'd8'),
+}
+
+
+def load_rules(name_or_path) -> Rules:
+    """Rules of the named variant, or read from a JSON file"""
+    if name_or_path in VARIANTS:
+        return VARIANTS[name_or_path]
+    if not os.path.exists(name_or_path):
+        raise RulesError("no variant or rules file {!r} (variants: {})".format(
+            name_or_path, ', '.join(sorted(VARIANTS))))
+    with open(name_or_path) as definition:
+        try:
+            return Rules.from_dict(json.load(definition))
+        except ValueError as err:  # also RulesError
+            raise RulesError("{}: {}".format(name_or_path, err)) from None
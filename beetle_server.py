@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""asyncio game server for the dice game Beetle
+
+Hosts many tables in one process. Clients talk line delimited JSON over TCP,
+one request object per line and one reply object per line:
+
+    {"op": "new", "players": 2}          new table, taking seat 0
+    {"op": "new", "players": 2, "hotseat": true}
+                                         new table, taking every seat
+    {"op": "join", "table": 7}           next free seat at table 7
+    {"op": "roll"}                       roll for our seat, if it is our turn
+    {"op": "state"}                      stages of every seat at our table
+    {"op": "leave"}                      leave our table
+    {"op": "watch", "table": 7}          spectate table 7
+    {"op": "unwatch", "table": 7}        stop spectating table 7
+
+Replies have "ok": true and the result, or "ok": false and an "error".
+A roll reply holds the seat, the roll, whether a part was built, the new
+stage and the winning seat once there is one.
+
+Spectators get the table's state in the reply to watch, then feed lines
+between their replies. Feed lines carry an "event" where replies carry
+"ok", so the two are told apart by their first key:
+
+    {"event": "turn", "table": 7, "seat": 1, "roll": 4, "stage": 3}
+    {"event": "snapshot", "table": 7, "stages": [...], "next_seat": 0, "winner": null}
+    {"event": "closed", "table": 7}
+
+A turn line is encoded once and the same bytes are written to every
+watcher. A watcher that falls behind gets no turns until it catches up,
+and then a single snapshot in place of all it missed. One that stays
+behind too long is dropped. Once the table is closed nothing more comes.
+
+Every table rolls its own CounterRandom stream of the server seed, so any
+table can be replayed from the seed and the table number. Replies are only
+read from a connection once the previous reply has been drained, so a slow
+client stalls itself and nobody else."""
+
+import argparse
+import asyncio
+import json
+import signal
+
+from beetle_cli import Beetle, Die
+from beetle_events import SILENT
+from beetle_rng import CounterRandom
+
+MAX_LINE = 4096  # longest request accepted, in bytes
+WRITE_HIGH_WATER = 64 * 1024  # bytes buffered for a client before we wait on it
+WATCH_HIGH_WATER = 16 * 1024  # bytes a watcher may fall behind before deltas stop
+MAX_STALE_TURNS = 10000  # turns a watcher may stay behind before it is dropped
+
+
+class GameError(Exception):
+    """A request that can't be carried out, reported back to the client"""
+
+
+class Table:
+    """One game of Beetle, played a roll at a time by remote players"""
+
+    def __init__(self, table_id, num_players, die):
+        self.id = table_id
+        self.players = [Beetle("Player " + str(i + 1), sink=SILENT) for i in range(num_players)]
+        self.die = die
+        self.next_seat = 0  # seat whose turn it is
+        self.winner = None
+        self.seated = [False] * num_players
+        self.members = 0  # connections sitting at the table
+        self.feed = None  # SpectatorFeed, once someone watches
+
+    def take_seat(self) -> int:
+        """Takes the first free seat"""
+        for seat, taken in enumerate(self.seated):
+            if not taken:
+                self.seated[seat] = True
+                return seat
+        raise GameError("table is full")
+
+    def roll(self):
+        """Rolls for the seat whose turn it is, in the order Game.turn uses
+
+        Returns (seat, roll, built)"""
+        if self.winner is not None:
+            raise GameError("game is over")
+        seat = self.next_seat
+        player = self.players[seat]
+        roll = self.die.roll()
+        built = player.turn(roll)
+        if player.complete():
+            self.winner = seat
+        self.next_seat = (seat + 1) % len(self.players)
+        return seat, roll, built
+
+    def stages(self) -> list:
+        """Build stage of every seat"""
+        return [player.stage for player in self.players]
+
+    def state(self) -> dict:
+        """Everything a client needs to draw the table"""
+        return {'table': self.id, 'stages': self.stages(),
+                'next_seat': self.next_seat, 'winner': self.winner}
+
+
+class SpectatorFeed:
+    """Fans the turns of one table out to its watchers"""
+
+    def __init__(self, table):
+        self.table = table
+        self.watchers = {}  # _Connection: turns missed while behind, 0 if up to date
+
+    def add(self, conn):
+        self.watchers[conn] = 0
+        conn.watching.add(self.table)
+
+    def remove(self, conn):
+        self.watchers.pop(conn, None)
+        conn.watching.discard(self.table)
+
+    def snapshot(self) -> bytes:
+        return json.dumps(dict(event='snapshot', **self.table.state())).encode() + b'\n'
+
+    def publish(self, seat, roll, stage):
+        """Sends one turn to every watcher, coalescing for slow ones"""
+        delta = b'{"event": "turn", "table": %d, "seat": %d, "roll": %d, "stage": %d}\n' % (
+            self.table.id, seat, roll, stage)
+        snapshot = None
+        dropped = []
+        for conn, missed in self.watchers.items():
+            transport = conn.transport
+            if transport.is_closing():
+                dropped.append(conn)
+            elif transport.get_write_buffer_size() > WATCH_HIGH_WATER:
+                if missed >= MAX_STALE_TURNS:
+                    transport.abort()
+                    dropped.append(conn)
+                else:
+                    self.watchers[conn] = missed + 1
+            elif missed:
+                if snapshot is None:
+                    snapshot = self.snapshot()
+                transport.write(snapshot)
+                self.watchers[conn] = 0
+            else:
+                transport.write(delta)
+        for conn in dropped:
+            self.remove(conn)
+
+    def close(self):
+        """Tells every watcher the table is gone"""
+        closed = b'{"event": "closed", "table": %d}\n' % self.table.id
+        for conn in self.watchers:
+            if not conn.transport.is_closing():
+                conn.transport.write(closed)
+            conn.watching.discard(self.table)
+        self.watchers.clear()
+
+
+class _Connection:
+    """What the server knows about one client"""
+
+    __slots__ = ('table', 'seats', 'transport', 'watching')
+
+    def __init__(self, transport=None):
+        self.table = None
+        self.seats = ()
+        self.transport = transport
+        self.watching = set()  # tables this client spectates
+
+
+class BeetleServer:
+    """Serves any number of Beetle tables over TCP"""
+
+    def __init__(self, host='127.0.0.1', port=8424, seed=0, max_players=8):
+        self.host = host
+        self.port = port
+        self.seed = seed
+        self.max_players = max_players
+        self.tables = {}
+        self._next_table = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        """Starts listening. Port 0 picks a free port, stored in self.port"""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                  limit=MAX_LINE)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Serves until shutdown is called"""
+        async with self._server:
+            try:
+                await self._server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+    async def shutdown(self, timeout=5.0):
+        """Stops accepting clients, tells the connected ones and closes them"""
+        self._server.close()
+        notice = b'{"event": "shutdown"}\n'
+        for writer in list(self._writers):
+            writer.write(notice)
+            writer.close()
+        await asyncio.wait_for(self._server.wait_closed(), timeout)
+
+    def new_table(self, num_players) -> Table:
+        """Creates a table rolling its own stream of the server seed"""
+        if not 1 <= num_players <= self.max_players:
+            raise GameError("players must be between 1 and {}".format(self.max_players))
+        table_id = self._next_table
+        self._next_table += 1
+        die = Die(rng=CounterRandom(self.seed, stream=table_id))
+        table = self.tables[table_id] = Table(table_id, num_players, die)
+        return table
+
+    def _leave(self, conn):
+        """Gets conn up from its table, removing the table once it is empty"""
+        table = conn.table
+        if table is None:
+            return
+        for seat in conn.seats:
+            table.seated[seat] = False
+        table.members -= 1
+        if table.members == 0:
+            del self.tables[table.id]
+            if table.feed is not None:
+                table.feed.close()
+        conn.table = None
+        conn.seats = ()
+
+    def _sit(self, conn, table, seats):
+        self._leave(conn)
+        table.members += 1
+        conn.table = table
+        conn.seats = seats
+        return {'ok': True, 'table': table.id, 'seats': list(seats)}
+
+    def dispatch(self, conn, request) -> dict:
+        """Carries out one request and returns the reply"""
+        op = request.get('op')
+        if op == 'roll':
+            table = conn.table
+            if table is None:
+                raise GameError("not at a table")
+            if table.next_seat not in conn.seats:
+                raise GameError("not your turn")
+            seat, roll, built = table.roll()
+            stage = table.players[seat].stage
+            if table.feed is not None:
+                table.feed.publish(seat, roll, stage)
+            return {'ok': True, 'seat': seat, 'roll': roll, 'built': built,
+                    'stage': stage, 'winner': table.winner}
+        if op == 'new':
+            num_players = request.get('players', 2)
+            if type(num_players) is not int:  # bools and floats are no count
+                raise GameError("players must be a whole number")
+            table = self.new_table(num_players)
+            if request.get('hotseat'):
+                seats = tuple(table.take_seat() for _ in table.players)
+            else:
+                seats = (table.take_seat(),)
+            return self._sit(conn, table, seats)
+        if op == 'join':
+            table = self.tables.get(request.get('table'))
+            if table is None:
+                raise GameError("no such table")
+            if table is conn.table:
+                # already here; leaving first could close the table under us
+                return {'ok': True, 'table': table.id, 'seats': list(conn.seats)}
+            return self._sit(conn, table, (table.take_seat(),))
+        if op == 'state':
+            table = conn.table
+            if table is None:
+                raise GameError("not at a table")
+            return dict(table.state(), ok=True)
+        if op == 'leave':
+            self._leave(conn)
+            return {'ok': True}
+        if op == 'watch':
+            table = self.tables.get(request.get('table'))
+            if table is None:
+                raise GameError("no such table")
+            if table.feed is None:
+                table.feed = SpectatorFeed(table)
+            table.feed.add(conn)
+            return dict(table.state(), ok=True)
+        if op == 'unwatch':
+            table = self.tables.get(request.get('table'))
+            if table in conn.watching:
+                table.feed.remove(conn)
+            return {'ok': True}
+        raise GameError("unknown op {!r}".format(op))
+
+    async def _handle(self, reader, writer):
+        """Serves one client until it disconnects"""
+        writer.transport.set_write_buffer_limits(high=WRITE_HIGH_WATER)
+        self._writers.add(writer)
+        conn = _Connection(writer.transport)
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # line over MAX_LINE
+                    break
+                if not line:
+                    break
+                try:
+                    reply = self.dispatch(conn, json.loads(line))
+                except (GameError, ValueError, TypeError, AttributeError, OverflowError) as err:
+                    reply = {'ok': False, 'error': str(err)}
+                writer.write(json.dumps(reply).encode() + b'\n')
+                # returns at once unless the client has fallen behind
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            # also runs when the handler is cancelled, which then carries on
+            self._leave(conn)
+            for table in list(conn.watching):
+                table.feed.remove(conn)
+            self._writers.discard(writer)
+            writer.close()
+
+
+def main():
+    """Runs the server until Ctrl+C or SIGTERM"""
+    parser = argparse.ArgumentParser(description="Serve Beetle over TCP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8424)
+    parser.add_argument('--seed', type=int, default=0, help="seed of every table's dice")
+    args = parser.parse_args()
+
+    async def run():
+        server = BeetleServer(args.host, args.port, args.seed)
+        await server.start()
+        print('Serving Beetle on {}:{}'.format(server.host, server.port), flush=True)
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        serving = asyncio.ensure_future(server.serve_forever())
+        await stop.wait()
+        await server.shutdown()
+        serving.cancel()
+        print('Goodbye.')
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
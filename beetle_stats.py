@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""Streaming statistics for long Beetle simulation campaigns
+
+CampaignStats takes games one at a time, as they finish, and keeps only
+summaries: Welford running mean and variance, fixed bucket histograms and
+a quantile sketch. Memory stays the same however many games go in. Two
+CampaignStats built from different workers or runs merge into the one a
+single run over all their games would give, and a snapshot can be taken
+at any time without stopping the campaign.
+
+Games go in as their rolls, through add_game or a StatsSink passed to
+Game. Simulators that only know who won and when, like beetle_batch and
+beetle_crowd, use add_result, which leaves the per stage statistics
+alone. Only statistics of games played by the same rules can be merged."""
+
+import argparse
+from collections import Counter
+import json
+import math
+
+from beetle_cli import RULES, Game
+from beetle_events import EventSink
+from beetle_rules import Rules, load_rules
+
+MAX_ROUNDS_BUCKET = 200  # rounds histogram has a bucket per round up to this
+
+
+class RunningStat:
+    """Count, mean, variance, min and max of a stream of numbers (Welford)"""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # sum of squared differences from the mean
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def merge(self, other):
+        """Adds every value other has seen (Chan et al.)"""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance, 0 for fewer than two values"""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2,
+                'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, state):
+        stat = cls()
+        for name in cls.__slots__:
+            setattr(stat, name, state[name])
+        return stat
+
+
+class Histogram:
+    """Counts of whole numbers in buckets 0 to num_buckets - 1, with one
+    more bucket for everything above"""
+
+    __slots__ = ('counts',)
+
+    def __init__(self, num_buckets):
+        self.counts = [0] * (num_buckets + 1)
+
+    def add(self, value):
+        self.counts[min(value, len(self.counts) - 1)] += 1
+
+    def merge(self, other):
+        if len(other.counts) != len(self.counts):
+            raise ValueError("histograms have different buckets")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def to_dict(self) -> dict:
+        return {'counts': list(self.counts)}
+
+    @classmethod
+    def from_dict(cls, state):
+        histogram = cls(len(state['counts']) - 1)
+        histogram.counts = list(state['counts'])
+        return histogram
+
+
+class QuantileSketch:
+    """Mergeable quantile sketch of whole numbers, in the style of HdrHistogram
+
+    Values below 2**SUB_BITS get a bucket each, so quantiles of game lengths
+    are exact. Above that every power of two is split into 2**(SUB_BITS - 1)
+    buckets, so a quantile is off by under 1.6% whatever its size, in
+    constant memory. Two sketches merge by adding their counts."""
+
+    SUB_BITS = 7
+
+    def __init__(self):
+        self.counts = Counter()
+        self.total = 0
+        self.max = 0
+
+    def record(self, value):
+        value = int(value)
+        if value < 1 << self.SUB_BITS:
+            index = value
+        else:
+            shift = value.bit_length() - self.SUB_BITS
+            index = (shift << (self.SUB_BITS - 1)) + (value >> shift)
+        self.counts[index] += 1
+        self.total += 1
+        self.max = max(self.max, value)
+
+    def bucket_value(self, index) -> int:
+        """Highest value that lands in bucket index"""
+        half = 1 << (self.SUB_BITS - 1)
+        if index < half << 1:
+            return index
+        shift = index // half - 1
+        return ((index - shift * half + 1) << shift) - 1
+
+    def percentile(self, percent) -> int:
+        """Value that percent of the recorded values are at or under"""
+        wanted = self.total * percent / 100
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= wanted:
+                return min(self.bucket_value(index), self.max)
+        return self.max
+
+    def merge(self, other):
+        """Adds the counts of other into this sketch"""
+        self.counts.update(other.counts)
+        self.total += other.total
+        self.max = max(self.max, other.max)
+
+    def to_dict(self) -> dict:
+        return {'counts': sorted(self.counts.items()), 'total': self.total, 'max': self.max}
+
+    @classmethod
+    def from_dict(cls, state):
+        sketch = cls()
+        sketch.counts = Counter(dict((int(index), count) for index, count in state['counts']))
+        sketch.total = state['total']
+        sketch.max = state['max']
+        return sketch
+
+
+class CampaignStats:
+    """Everything worth knowing about a stream of games, in constant memory"""
+
+    def __init__(self, rules=RULES):
+        self.rules = rules
+        self.games = 0
+        self.num_players = 0  # most players seen in a game
+        self.wins = Counter()  # seat: games won
+        self.rounds = RunningStat()
+        self.rounds_histogram = Histogram(MAX_ROUNDS_BUCKET + 1)
+        self.rounds_sketch = QuantileSketch()
+        # rolls that built nothing at each unfinished stage, and rolls that
+        # built a part and left it. Their ratio is the mean wait at the
+        # stage, counting the waits cut short by someone else winning
+        self.wasted = [0] * (rules.num_states - 1)
+        self.left = [0] * (rules.num_states - 1)
+        # per player and game: the player's turn on which each part was built
+        self.part_turn = [RunningStat() for _ in range(rules.num_parts)]
+
+    def add_result(self, winner, rounds, num_players=None):
+        """Adds a game known only by its winning seat and length in rounds"""
+        self.games += 1
+        self.num_players = max(self.num_players, num_players or 0, winner + 1)
+        self.wins[winner] += 1
+        self.rounds.add(rounds)
+        self.rounds_histogram.add(rounds)
+        self.rounds_sketch.record(rounds)
+
+    def add_game(self, num_players, rolls):
+        """Adds a game from all of its rolls, in the order they were rolled"""
+        transitions = self.rules.transitions
+        new_part = self.rules.new_part
+        wasted = self.wasted
+        left = self.left
+        stages = [0] * num_players
+        for turn, roll in enumerate(rolls):
+            seat = turn % num_players
+            stage = stages[seat]
+            after = transitions[stage][roll]
+            if after == stage:
+                wasted[stage] += 1
+                continue
+            stages[seat] = after
+            left[stage] += 1
+            self.part_turn[new_part[stage][roll]].add(turn // num_players + 1)
+        num_rolls = len(rolls)
+        self.add_result((num_rolls - 1) % num_players, (num_rolls - 1) // num_players + 1,
+                        num_players)
+
+    def merge(self, other):
+        """Adds every game other has seen, which must follow the same rules"""
+        if other.rules.fingerprint != self.rules.fingerprint:
+            raise ValueError("can't merge statistics of {} and {} rules".format(
+                self.rules.name, other.rules.name))
+        self.games += other.games
+        self.num_players = max(self.num_players, other.num_players)
+        self.wins.update(other.wins)
+        self.rounds.merge(other.rounds)
+        self.rounds_histogram.merge(other.rounds_histogram)
+        self.rounds_sketch.merge(other.rounds_sketch)
+        self.wasted = [mine + theirs for mine, theirs in zip(self.wasted, other.wasted)]
+        self.left = [mine + theirs for mine, theirs in zip(self.left, other.left)]
+        for mine, theirs in zip(self.part_turn, other.part_turn):
+            mine.merge(theirs)
+
+    def snapshot(self) -> dict:
+        """Summary of the games so far, safe to keep while more come in"""
+        return {
+            'games': self.games,
+            'win_rate': [self.wins[seat] / self.games for seat in range(self.num_players)],
+            'rounds': {
+                'mean': self.rounds.mean, 'stdev': self.rounds.stdev,
+                'min': self.rounds.min, 'max': self.rounds.max,
+                'percentiles': {str(p): self.rounds_sketch.percentile(p)
+                                for p in (50, 90, 99, 99.9)},
+            },
+            'wasted_rolls': [wasted / left if left else 0.0
+                             for wasted, left in zip(self.wasted, self.left)],
+            'part_turn': [stat.mean for stat in self.part_turn],
+        }
+
+    def to_dict(self) -> dict:
+        """Full state, as plain data that can be saved as JSON"""
+        return {
+            'rules': self.rules.to_dict(),
+            'games': self.games,
+            'num_players': self.num_players,
+            'wins': sorted(self.wins.items()),
+            'rounds': self.rounds.to_dict(),
+            'rounds_histogram': self.rounds_histogram.to_dict(),
+            'rounds_sketch': self.rounds_sketch.to_dict(),
+            'wasted': list(self.wasted),
+            'left': list(self.left),
+            'part_turn': [stat.to_dict() for stat in self.part_turn],
+        }
+
+    @classmethod
+    def from_dict(cls, state):
+        stats = cls(Rules.from_dict(state['rules']) if 'rules' in state else RULES)
+        stats.games = state['games']
+        stats.wins = Counter(dict((int(seat), count) for seat, count in state['wins']))
+        stats.num_players = state.get('num_players', max(stats.wins, default=-1) + 1)
+        stats.rounds = RunningStat.from_dict(state['rounds'])
+        stats.rounds_histogram = Histogram.from_dict(state['rounds_histogram'])
+        stats.rounds_sketch = QuantileSketch.from_dict(state['rounds_sketch'])
+        stats.wasted = list(state['wasted'])
+        stats.left = list(state['left'])
+        stats.part_turn = [RunningStat.from_dict(stat) for stat in state['part_turn']]
+        return stats
+
+
+class StatsSink(EventSink):
+    """Feeds the games it watches into a CampaignStats
+
+    Call start_game before each game and pass the sink to Game."""
+
+    enabled = True
+
+    def __init__(self, stats):
+        self.stats = stats
+        self._num_players = None
+        self._rolls = bytearray()
+
+    def start_game(self, num_players):
+        """Starts watching a new game, returning the sink to use"""
+        self._num_players = num_players
+        self._rolls = bytearray()
+        return self
+
+    def roll(self, player, roll):
+        self._rolls.append(roll)
+
+    def win(self, player):
+        self.stats.add_game(self._num_players, self._rolls)
+
+
+def main():
+    """Plays a campaign, printing a snapshot of its statistics"""
+    parser = argparse.ArgumentParser(description="Statistics of a Beetle campaign")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    args = parser.parse_args()
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    from beetle_rng import game_die
+    stats = CampaignStats(rules)
+    sink = StatsSink(stats)
+    for number in range(args.games):
+        game = Game(args.players, die=game_die(args.seed, number, rules.num_sides),
+                    sink=sink.start_game(args.players), rules=rules)
+        while not game.round():
+            pass
+    snap = stats.snapshot()
+    part_names = [name for name, _, _ in rules.parts]
+    if rules.chain:
+        # stage n is waiting for part n
+        snap['wasted_rolls'] = dict(zip(part_names, snap['wasted_rolls']))
+    snap['part_turn'] = dict(zip(part_names, snap['part_turn']))
+    print(json.dumps(snap, indent=2))
+
+
+if __name__ == "__main__":
+    main()
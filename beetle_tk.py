@@ -0,0 +1,484 @@
+"""Tk window for the dice game Beetle
+
+Kept apart from beetle.py so that importing the game, for example to
+benchmark or replay it, does not load tkinter.
+
+Every player gets a board on one scrolling Canvas. A board is a stack of
+image items, one layer per part from beetle_assets, each shown once its
+part is built. Parts of a rules variant that have no layer are not drawn.
+Only the boards in view have items, so the cost of a turn doesn't grow
+with the number of players. Each layer is decoded the first time a board
+shows it.
+
+Auto-play advances the game in chunks scheduled with after(), and the
+simulation of many games runs in a worker thread that passes its results
+through a queue, so neither blocks mainloop. Both redraw at most once per
+FRAME_MS."""
+
+from array import array
+import queue
+import threading
+import time
+from tkinter import *       # Tkinter GUI components
+from tkinter.ttk import *   # Modern Tkinter ToolKit components
+
+import beetle_cli
+from beetle import Beetle, Game, Renderer
+from beetle_assets import BOARD_SIZE, PART_LAYERS, STAGE_FILES
+from beetle_events import CONSOLE, SILENT
+from beetle_rules import STANDARD
+
+FRAME_MS = 33  # shortest time between redraws, about 30 a second
+# Auto-play speeds in rounds per second, None meaning as fast as possible
+SPEEDS = (1, 2, 5, 10, 30, 100, None)
+SIMULATED_GAMES = 1000
+NAME_HEIGHT = 20  # room under each board for the player's name
+MAX_COLUMNS = 6  # boards side by side when the window opens
+MAX_ROWS = 4  # rows of boards in view when the window opens
+
+
+def part_layers(rules) -> list:
+    """(part, layer) for every part of rules that has a layer to draw"""
+    layer_of = {name[:-4].replace('_', ' '): layer
+                for layer, name in enumerate(STAGE_FILES[1:])}
+    return [(part, layer_of[name]) for part, (name, _, _) in enumerate(rules.parts)
+            if name in layer_of]
+
+
+def board_scale(num_players) -> int:
+    """How many times smaller than BOARD_SIZE to draw each board"""
+    if num_players <= 2:
+        return 1
+    return 2 if num_players <= 6 else 3
+
+
+class PartSprites:
+    """PhotoImage for each part layer, decoded on first use and kept
+
+    Keeping them also stops them from being garbage collected while the
+    canvas shows them. With a scale over 1 the layers are shrunk by that
+    factor."""
+
+    def __init__(self, master=None, scale=1):
+        self._master = master
+        self._scale = scale
+        self._images = [None] * len(PART_LAYERS)
+
+    def __len__(self):
+        return len(self._images)
+
+    def __getitem__(self, part):
+        image = self._images[part]
+        if image is None:
+            image = PhotoImage(master=self._master, data=PART_LAYERS[part][2])
+            if self._scale > 1:
+                image = image.subsample(self._scale)
+            self._images[part] = image
+        return image
+
+
+class _CanvasItem:
+    """One canvas item, configured like a widget so the Renderer can update it"""
+
+    __slots__ = ('_canvas', '_item')
+
+    def __init__(self, canvas, item):
+        self._canvas = canvas
+        self._item = item
+
+    def __setitem__(self, option, value):
+        self._canvas.itemconfigure(self._item, {option: value})
+
+
+class _Slot:
+    """Canvas items of one board in view: a name and a layer per part"""
+
+    __slots__ = ('board', 'name', 'parts', 'items')
+
+    def __init__(self, canvas, layers):
+        self.board = None  # seat shown, None if the slot is unused
+        self.items = [canvas.create_text(0, 0, anchor=N, state=HIDDEN)]
+        # images are given by BoardView._show once a part is first built
+        self.items += [canvas.create_image(0, 0, anchor=NW, state=HIDDEN) for _ in layers]
+        self.name = _CanvasItem(canvas, self.items[0])
+        self.parts = [_CanvasItem(canvas, item) for item in self.items[1:]]
+
+
+class BoardView(Frame):
+    """The boards of every player on one scrolling Canvas
+
+    Only the boards in view have canvas items. A pool of slots, enough to
+    fill the view, is moved between boards as it scrolls or resizes; a turn
+    updates at most one slot, through the renderer, and a board out of view
+    costs nothing to update."""
+
+    def __init__(self, master, num_players, renderer, scale=None, rules=STANDARD):
+        Frame.__init__(self, master)
+        scale = scale or board_scale(num_players)
+        self._init_layout(num_players, renderer, scale, rules, PartSprites(self, scale))
+        rows = min(-(-num_players // self._columns), MAX_ROWS)
+
+        self._canvas = Canvas(self, width=self._columns * self._tile_width,
+                              height=rows * self._tile_height, highlightthickness=0)
+        self._canvas.grid(column=0, row=0, sticky=(N, W, E, S))
+        self._scrollbar = Scrollbar(self, orient=VERTICAL, command=self._yview)
+        self._scrollbar.grid(column=1, row=0, sticky=(N, S))
+        self._canvas['yscrollcommand'] = self._scrollbar.set
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+        self._canvas.bind('<Configure>', self._resize)
+        for event in ('<MouseWheel>', '<Button-4>', '<Button-5>'):
+            self._canvas.bind(event, self._wheel)
+
+    def _init_layout(self, num_players, renderer, scale, rules, sprites):
+        """Sets up everything but the widgets, so the drawing code can also
+        run on a stand-in canvas where there is no display"""
+        self.num_players = num_players
+        self._renderer = renderer
+        self._rules = rules
+        self._scale = scale
+        self._sprites = sprites
+        # (part, layer) drawn by each image item of a slot
+        self._parts = part_layers(rules)
+        self._layers = [(x // self._scale, y // self._scale)
+                        for x, y, _ in (PART_LAYERS[layer] for _, layer in self._parts)]
+        self._stages = array('B' if rules.num_states <= 256 else 'H', [0]) * num_players
+        self._tile_width = BOARD_SIZE[0] // self._scale + 10
+        self._tile_height = BOARD_SIZE[1] // self._scale + NAME_HEIGHT
+        self._columns = min(num_players, MAX_COLUMNS)
+        self._slots = []
+        self._first = 0  # board shown by the first slot
+
+    def draw(self, seat, stage):
+        """Shows the board of seat at stage, if it is in view"""
+        self._stages[seat] = stage
+        index = seat - self._first
+        if 0 <= index < len(self._slots):
+            self._show(self._slots[index], stage)
+
+    def show(self, stages):
+        """Shows every board at the given stages"""
+        self._stages[:] = array(self._stages.typecode, stages)
+        for slot in self._slots:
+            if slot.board is not None:
+                self._show(slot, self._stages[slot.board])
+
+    def _show(self, slot, stage):
+        set_state = self._renderer.set
+        built = self._rules.built[stage]
+        for (part, layer), item in zip(self._parts, slot.parts):
+            if built >> part & 1:
+                # decodes the layer the first time any board shows it
+                set_state(item, 'image', self._sprites[layer])
+                set_state(item, 'state', NORMAL)
+            else:
+                set_state(item, 'state', HIDDEN)
+
+    def _yview(self, *args):
+        self._canvas.yview(*args)
+        self._place_slots()
+
+    def _wheel(self, event):
+        if event.num == 4 or event.delta > 0:
+            self._canvas.yview_scroll(-1, UNITS)
+        else:
+            self._canvas.yview_scroll(1, UNITS)
+        self._place_slots()
+
+    def _resize(self, event):
+        """Fits as many columns as the width allows, with slots to fill the height"""
+        self._columns = max(1, min(self.num_players, event.width // self._tile_width))
+        rows = -(-self.num_players // self._columns)
+        self._canvas['scrollregion'] = (0, 0, self._columns * self._tile_width,
+                                        rows * self._tile_height)
+        self._canvas['yscrollincrement'] = self._tile_height // 4
+        wanted = min(self.num_players,
+                     (event.height // self._tile_height + 2) * self._columns)
+        while len(self._slots) < wanted:
+            self._slots.append(_Slot(self._canvas, self._parts))
+        for slot in self._slots:
+            slot.board = -1  # every slot is placed again
+        self._place_slots()
+
+    def _place_slots(self):
+        """Moves the slots onto the boards now in view"""
+        top_row = int(self._canvas.canvasy(0)) // self._tile_height
+        first = top_row * self._columns
+        self._first = first
+        canvas = self._canvas
+        for index, slot in enumerate(self._slots):
+            board = first + index
+            if board >= self.num_players:
+                if slot.board is not None:
+                    slot.board = None
+                    self._renderer.set(slot.name, 'state', HIDDEN)
+                    self._show(slot, 0)
+                continue
+            if slot.board == board:
+                continue
+            slot.board = board
+            x = board % self._columns * self._tile_width
+            y = board // self._columns * self._tile_height
+            canvas.coords(slot.items[0], x + self._tile_width // 2,
+                          y + self._tile_height - NAME_HEIGHT)
+            for item, (left, top) in zip(slot.items[1:], self._layers):
+                canvas.coords(item, x + left, y + top)
+            self._renderer.set(slot.name, 'text', "Player " + str(board + 1))
+            self._renderer.set(slot.name, 'state', NORMAL)
+            self._show(slot, self._stages[board])
+
+
+class CanvasBeetle(Beetle):
+    """A Beetle drawn on its seat of a BoardView"""
+
+    __slots__ = ('_board', '_seat')
+
+    def __init__(self, name=None, board=None, seat=0, sink=CONSOLE, rules=STANDARD):
+        Beetle.__init__(self, name=name, sink=sink, rules=rules)
+        self._board = board
+        self._seat = seat
+
+    def turn(self, roll):
+        """Takes a turn, then draws the new part if one was built"""
+        out = Beetle.turn(self, roll)
+        if out:
+            self._board.draw(self._seat, self._stage)
+        return out
+
+
+def simulate(num_games, num_players, results, stop, rules=STANDARD):
+    """Plays num_games silent games, putting (winner, rounds) of each on the
+    results queue, then None. Stops early once stop is set"""
+    die = beetle_cli.DiceStream(rules.num_sides)
+    for _ in range(num_games):
+        if stop.is_set():
+            break
+        game = beetle_cli.Game(num_players, die=die, sink=SILENT, rules=rules)
+        rounds = 1
+        while not game.round():
+            rounds += 1
+        results.put((game.winner, rounds))
+    results.put(None)
+
+
+class Application(Frame):
+    """Application class wrapping the main GUI frame"""
+    def __init__(self, parent, profiler=None, replay=None, num_players=2, rules=STANDARD):
+        """Every game is fed to profiler, if given, which reports at game over.
+        Games are played by rules, which a replay must leave as the standard.
+
+        Given a ReplayCursor as replay, the window shows that game with a
+        slider to scrub through its turns instead of playing"""
+        Frame.__init__(self, parent, padding="3 3 12 12")
+        self._parent = parent
+        self.num_players = replay.num_players if replay is not None else num_players
+        self.rules = rules
+        self._profiler = profiler
+        self._replay = replay
+        self._auto_job = None  # after() id of the next auto-play step
+        self._sim_stop = threading.Event()
+        self._sim_results = None  # queue of the running simulation
+        self.setup()
+        self.reset()
+
+    def setup(self):
+        """Initialize the window and create some constants"""
+        # Every widget update goes through the renderer, once per round at most
+        self.renderer = Renderer(self)
+
+        self.grid(column=0, row=0, sticky=(N, W, E, S))
+        self._parent.columnconfigure(0, weight=1)
+        self._parent.rowconfigure(0, weight=1)
+        self.columnconfigure(1, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # board needs to be "public" so that the beetles can get to it
+        self.board = BoardView(self, self.num_players, self.renderer, rules=self.rules)
+        self.board.grid(column=0, row=0, columnspan=3, sticky=(N, W, E, S))
+
+        self.infotext = Label(self)
+        self.renderer.set(self.infotext, 'text', "Testing")
+        self.renderer.flush()  # so the window opens at its full size
+        self.infotext.grid(column=1, row=1, sticky=(W, S, E))
+
+        self._turn_button = Button(self, text="Roll", command=self.turn)
+        self._turn_button.grid(column=0, row=1, sticky=(W, S))
+
+        self._reset_button = Button(self, text="Reset", command=self.reset)
+        self._reset_button.grid(column=2, row=1, sticky=(E, S))
+
+        if self._replay is not None:
+            self._turn_button.state(['disabled'])
+            self._reset_button.state(['disabled'])
+            self._scrubber = Scale(self, from_=0, to=len(self._replay),
+                                   orient=HORIZONTAL, command=self.show_turn)
+            self._scrubber.grid(column=0, row=2, columnspan=3, sticky=(W, E))
+
+        self._auto_button = Button(self, text="Auto", command=self.toggle_auto)
+        self._auto_button.grid(column=0, row=3, sticky=W)
+        self._speed = IntVar(self, value=2)
+        self._speed_scale = Scale(self, from_=0, to=len(SPEEDS) - 1, orient=HORIZONTAL,
+                                  variable=self._speed, command=self._show_speed)
+        self._speed_scale.grid(column=1, row=3, sticky=(W, E))
+        self._speed_label = Label(self)
+        self._speed_label.grid(column=2, row=3, sticky=E)
+        self._finish_button = Button(self, text="Finish", command=self.play_to_end)
+        self._finish_button.grid(column=0, row=4, sticky=W)
+        self._stats = Label(self)
+        self._stats.grid(column=1, row=4, sticky=(W, E))
+        self._simulate_button = Button(self, text="Simulate {:,}".format(SIMULATED_GAMES),
+                                       command=self.simulate)
+        self._simulate_button.grid(column=2, row=4, sticky=E)
+        self._show_speed(self._speed.get())
+        if self._replay is not None:
+            for button in (self._auto_button, self._finish_button, self._simulate_button):
+                button.state(['disabled'])
+
+        for child in self.winfo_children():
+            # go through every child and set some params
+            child.grid_configure(padx=5, pady=5)
+
+        self._turn_button.focus()
+
+    def new_beetle(self, name, seat, sink):
+        """Player for seat, used by Game"""
+        return CanvasBeetle(name, board=self.board, seat=seat, sink=sink, rules=self.rules)
+
+    def turn(self):
+        """Takes a turn in the game"""
+        self._game.round()
+        if self._game.complete:
+            self.game_over()
+
+    def _show_speed(self, value):
+        speed = SPEEDS[int(float(value))]
+        self.renderer.set(self._speed_label, 'text', "Instant" if speed is None
+                          else "{} rounds/s".format(speed))
+
+    def toggle_auto(self):
+        """Starts or stops playing rounds at the chosen speed"""
+        if self._auto_job is None:
+            self._auto_button['text'] = "Stop"
+            self._auto_step()
+        else:
+            self.stop_auto()
+
+    def play_to_end(self):
+        """Plays the game out as fast as possible"""
+        self._speed.set(len(SPEEDS) - 1)
+        self._show_speed(self._speed.get())
+        if self._auto_job is None:
+            self.toggle_auto()
+
+    def stop_auto(self):
+        if self._auto_job is not None:
+            self.after_cancel(self._auto_job)
+            self._auto_job = None
+        self._auto_button['text'] = "Auto"
+
+    def _auto_step(self):
+        """Plays the rounds due in one frame, then schedules the next step"""
+        speed = SPEEDS[self._speed.get()]
+        if speed is None:  # play for half a frame, leaving Tk the other half
+            deadline = time.perf_counter() + FRAME_MS / 2000
+            while not self._game.complete and time.perf_counter() < deadline:
+                self._game.round()
+            delay = FRAME_MS
+        else:
+            for _ in range(max(1, speed * FRAME_MS // 1000)):
+                if self._game.round():
+                    break
+            delay = max(FRAME_MS, 1000 // speed)
+        if self._game.complete:
+            self._auto_job = None
+            self.game_over()
+        else:
+            self._auto_job = self.after(delay, self._auto_step)
+
+    def simulate(self, num_games=SIMULATED_GAMES):
+        """Plays num_games games in a worker thread, showing the stats as
+        they come in"""
+        self._simulate_button.state(['disabled'])
+        self._sim_stop.clear()
+        self._sim_results = queue.Queue()
+        self._sim_total = num_games
+        self._sim_wins = [0] * self.num_players
+        self._sim_rounds = []
+        threading.Thread(target=simulate, daemon=True,
+                         args=(num_games, self.num_players, self._sim_results,
+                               self._sim_stop, self.rules)).start()
+        self.after(FRAME_MS, self._poll_simulation)
+
+    def _poll_simulation(self):
+        """Takes every result the worker has finished since the last frame"""
+        done = False
+        try:
+            while True:
+                result = self._sim_results.get_nowait()
+                if result is None:
+                    done = True
+                    break
+                winner, rounds = result
+                self._sim_wins[winner] += 1
+                self._sim_rounds.append(rounds)
+        except queue.Empty:
+            pass
+        played = len(self._sim_rounds)
+        if played:
+            rounds = self._sim_rounds
+            seats = range(self.num_players)
+            if self.num_players > 4:  # first, last and luckiest seat
+                seats = sorted({0, self.num_players - 1,
+                                max(seats, key=self._sim_wins.__getitem__)})
+            wins = ', '.join('Player {} won {:.1%}'.format(seat + 1, self._sim_wins[seat] / played)
+                             for seat in seats)
+            self.renderer.set(self._stats, 'text', (
+                "{:,}/{:,} games: {}\nrounds: mean {:.1f}, min {}, max {}").format(
+                    played, self._sim_total, wins, sum(rounds) / played, min(rounds), max(rounds)))
+        if done:
+            self._simulate_button.state(['!disabled'])
+        else:
+            self.after(FRAME_MS, self._poll_simulation)
+
+    def destroy(self):
+        self._sim_stop.set()
+        Frame.destroy(self)
+
+    def game_over(self):
+        """Caled when a player wins the game"""
+        # The game is over! Disable rolling more turns.
+        self.stop_auto()
+        for button in (self._turn_button, self._auto_button, self._finish_button):
+            button.state(['disabled'])
+        self._reset_button.focus()
+        self.renderer.set(self.infotext, 'text',
+                          self.renderer.get(self.infotext, 'text') + "Game Over!")
+        if self._profiler is not None:
+            self._profiler.report()
+
+    def show_turn(self, value):
+        """Shows the replay as it was after the given number of turns"""
+        turn = int(float(value))
+        stages = self._replay.seek(turn)
+        self.board.show(stages)
+        if turn == 0:
+            self.renderer.set(self.infotext, 'text', "Turn 0")
+            return
+        seat, roll = self._replay.turn_info(turn)
+        text = "Turn {}: Player {} rolled a {}".format(turn, seat + 1, roll)
+        if turn == len(self._replay):
+            text += "\nPlayer {} wins!".format(seat + 1)
+        self.renderer.set(self.infotext, 'text', text)
+
+    def reset(self):
+        """Resets the game state"""
+        if self._replay is not None:
+            self.show_turn(0)
+            return
+        self.stop_auto()
+        self._game = Game(app=self, profiler=self._profiler)
+        self.board.show([0] * self.num_players)
+        for button in (self._turn_button, self._auto_button, self._finish_button):
+            button.state(['!disabled'])
+        self._turn_button.focus()
+
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""Multi-core tournament runner for the dice game Beetle
+
+Splits a large number of games into fixed size chunks and plays them on a
+process pool with the batch simulator. Every chunk gets its own seed stream,
+derived from the master seed and the chunk number alone, so the same master
+seed gives the same results no matter how many workers are used. Workers
+only send back counts, never individual games.
+
+With a checkpoint file, the chunks finished so far and their totals are
+saved every CHECKPOINT_INTERVAL seconds and when the run is interrupted.
+Since a chunk's games depend only on the master seed and its number, a
+resumed run plays exactly the chunks that are left and ends with the same
+totals as a run that was never stopped."""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from beetle_batch import simulate, simulate_skip
+from beetle_cli import RULES, RULES_VERSION
+from beetle_rules import Rules, load_rules
+
+CHUNK_SIZE = 100000  # games played by a worker per task
+CHECKPOINT_INTERVAL = 60.0  # seconds between checkpoints
+CHECKPOINT_VERSION = 1
+
+
+def chunk_seed(seed, chunk):
+    """Independent seed stream for one chunk of a tournament"""
+    return np.random.SeedSequence([seed, chunk])
+
+
+def play_chunk(seed, chunk, num_games, num_players, skip=False, rules=RULES):
+    """Plays one chunk of games and returns (wins per seat, games per round count)"""
+    engine = simulate_skip if skip else simulate
+    result = engine(num_games, num_players, seed=chunk_seed(seed, chunk), rules=rules)
+    wins = np.bincount(result.winners, minlength=num_players)
+    rounds = np.bincount(result.rounds)
+    return wins.tolist(), rounds.tolist()
+
+
+def merge_counts(total, counts):
+    """Adds counts into total elementwise, growing total as needed"""
+    if len(total) < len(counts):
+        total.extend([0] * (len(counts) - len(total)))
+    for i, count in enumerate(counts):
+        total[i] += count
+    return total
+
+
+class CheckpointError(Exception):
+    """A checkpoint that can't be resumed"""
+
+
+def save_checkpoint(path, state):
+    """Writes state to path as JSON, replacing the old file in one step
+
+    The new checkpoint goes to a temporary file in the same directory first,
+    so a crash while writing leaves the previous checkpoint whole."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path))
+    try:
+        with os.fdopen(fd, 'w') as out:
+            json.dump(state, out)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def load_checkpoint(path) -> dict:
+    """Reads a checkpoint written by run, checking it is one we can resume"""
+    with open(path) as checkpoint:
+        state = json.load(checkpoint)
+    if state.get('version') != CHECKPOINT_VERSION:
+        raise CheckpointError("{} is not a tournament checkpoint".format(path))
+    if state['rules_version'] != RULES_VERSION:
+        raise CheckpointError("{} was made with rules version {}, these are version {}".format(
+            path, state['rules_version'], RULES_VERSION))
+    return state
+
+
+def run(num_games, num_players=2, seed=None, workers=None, chunk_size=CHUNK_SIZE,
+        skip=False, checkpoint=None, resume_from=None,
+        checkpoint_interval=CHECKPOINT_INTERVAL, rules=RULES) -> dict:
+    """Plays num_games games by rules across workers processes (default all
+    cores)
+
+    With skip, games are played with the skip-ahead simulator. With a
+    checkpoint path, progress is saved there as the run goes. resume_from
+    is a state from load_checkpoint to carry on from, whose settings then
+    replace the ones given.
+
+    Returns the totals for the whole tournament: the seed used, the number
+    of games, the wins for each seat and rounds[t], the number of games won
+    in round t."""
+    if resume_from is not None:
+        state = resume_from
+    else:
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        state = {'version': CHECKPOINT_VERSION, 'rules_version': RULES_VERSION,
+                 'seed': seed, 'games': num_games, 'players': num_players,
+                 'chunk_size': chunk_size, 'skip': skip, 'rules': rules.to_dict(),
+                 'done': [], 'wins': [0] * num_players, 'rounds': []}
+    seed, num_games, num_players = state['seed'], state['games'], state['players']
+    chunk_size, skip = state['chunk_size'], state['skip']
+    # checkpoints from before variants were all of the standard rules
+    rules = Rules.from_dict(state['rules']) if 'rules' in state else RULES
+    done = set(state['done'])
+    tasks = [(seed, chunk, min(chunk_size, num_games - start), num_players, skip, rules)
+             for chunk, start in enumerate(range(0, num_games, chunk_size))
+             if chunk not in done]
+
+    wins, rounds = state['wins'], state['rounds']
+    last_saved = time.monotonic()
+    pool = ProcessPoolExecutor(workers)
+    try:
+        futures = {pool.submit(play_chunk, *task): task[1] for task in tasks}
+        for future in as_completed(futures):
+            chunk_wins, chunk_rounds = future.result()
+            merge_counts(wins, chunk_wins)
+            merge_counts(rounds, chunk_rounds)
+            state['done'].append(futures[future])
+            if checkpoint is not None and time.monotonic() - last_saved >= checkpoint_interval:
+                save_checkpoint(checkpoint, state)
+                last_saved = time.monotonic()
+    except BaseException:
+        # keep every chunk that finished, then stop the rest
+        pool.shutdown(wait=False, cancel_futures=True)
+        if checkpoint is not None:
+            save_checkpoint(checkpoint, state)
+        raise
+    pool.shutdown()
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, state)
+
+    return {'seed': seed, 'games': num_games, 'wins': wins, 'rounds': rounds}
+
+
+def main():
+    """Runs a tournament described on the command line and prints the totals"""
+    parser = argparse.ArgumentParser(description="Play many games of Beetle on all cores")
+    parser.add_argument('--games', type=int, default=1000000, help="number of games to play")
+    parser.add_argument('--players', type=int, default=2, help="players per game")
+    parser.add_argument('--seed', type=int, default=None, help="master seed")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes (default one per core)")
+    parser.add_argument('--skip', action='store_true',
+                        help="sample waiting times instead of rolling every turn")
+    parser.add_argument('--rules', default='standard',
+                        help="variant to play: a built in variant or a JSON rules file")
+    parser.add_argument('--checkpoint', default=None,
+                        help="save progress to this file as the tournament runs")
+    parser.add_argument('--resume', action='store_true',
+                        help="carry on from the checkpoint, with its settings")
+    args = parser.parse_args()
+
+    try:
+        rules = load_rules(args.rules)
+    except (OSError, ValueError) as err:
+        parser.error(str(err))
+
+    state = None
+    if args.resume:
+        if args.checkpoint is None:
+            parser.error("--resume needs --checkpoint")
+        try:
+            state = load_checkpoint(args.checkpoint)
+        except (OSError, ValueError, CheckpointError) as err:
+            print(err, file=sys.stderr)
+            sys.exit(1)
+    elif args.checkpoint is not None and os.path.exists(args.checkpoint):
+        parser.error("{} exists, add --resume to carry on from it".format(args.checkpoint))
+
+    try:
+        totals = run(args.games, args.players, args.seed, args.workers, skip=args.skip,
+                     checkpoint=args.checkpoint, resume_from=state, rules=rules)
+    except KeyboardInterrupt:
+        if args.checkpoint is not None:
+            print('\nstopped, resume with --checkpoint', args.checkpoint, '--resume',
+                  file=sys.stderr)
+        sys.exit(130)
+    print('seed', totals['seed'])
+    print('games', totals['games'])
+    for seat, wins in enumerate(totals['wins']):
+        print('Player', seat + 1, 'wins', wins / totals['games'])
+    mean = sum(t * count for t, count in enumerate(totals['rounds'])) / totals['games']
+    print('mean rounds', mean)
+
+
+if __name__ == "__main__":
+    main()